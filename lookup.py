@@ -1,17 +1,23 @@
+import numpy as np
 import pandas as pd
 import re
 import os
+import pickle
 from typing import Optional, Dict, Any, List, Set
 from difflib import SequenceMatcher
 
 try:
-    from rapidfuzz import fuzz
+    from rapidfuzz import fuzz, process
 except ImportError:
     fuzz = None  # Fuzzy fallback disabled if rapidfuzz not installed
+    process = None
 
 # Cache for the Excel data to avoid reloading on every request
 _excel_cache: Optional[pd.DataFrame] = None
 EXCEL_PATH = "Primex_Kunden_mit_Verband.xlsb"
+# Parsed copy of EXCEL_PATH is reused while this version and the workbook's mtime/size are unchanged.
+# Bump the version whenever load_data's preprocessing changes.
+_EXCEL_CACHE_VERSION = 1
 VERBAND_FILTER = (27750, 29000, 30000)
 
 _iln_cache: Optional[pd.DataFrame] = None
@@ -31,6 +37,19 @@ MOMAX_BG_ALLOWED_KUNDENNUMMERN = {"68935", "68936", "68937", "68938", "68939", "
 #   PLZ -> _plz_digits_only. Company -> token set for tie-breaking (existing logic in find_customer_by_address).
 
 
+# Precompiled patterns for the address helpers below (called per row / per query).
+_PLZ_PREFIXED_RE = re.compile(r"[A-Z]+-\s*(\d{4,5})\b", re.IGNORECASE)
+_PLZ_ANY_RE = re.compile(r"\b(\d{4,5})\b")
+_NON_DIGIT_RE = re.compile(r"\D")
+_DIGITS_RE = re.compile(r"\d+")
+_ALNUM_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_HOUSE_NUMBER_RE = re.compile(r"\b\d{1,4}[a-z]?\b")
+_CITY_SPLIT_RE = re.compile(r"[\s/,]+")
+_PAREN_EDGE_RE = re.compile(r"^\(|\)$")
+_CITY_DISTRICT_PAREN_RE = re.compile(r"\s*\(\s*(\d+)\s*\)\s*")
+_NAME_SPLIT_RE = re.compile(r"[^a-z0-9äöüß]+")
+
+
 def _fix_mojibake(s: str) -> str:
     """Fix common encoding/mojibake so addresses from ILN Excel and Primex match (e.g. Haßfurt)."""
     if not isinstance(s, str):
@@ -66,7 +85,7 @@ def _normalize_city(s: str) -> str:
     # " am " -> "" and "/" -> "" so "Zell am See" and "Zell/See" both become "zellsee"
     s = s.replace(" am ", " ").replace("/", " ")
     # Remove parentheses but keep digits: "Wien (12)" -> "wien 12" then collapse
-    s = re.sub(r"\s*\(\s*(\d+)\s*\)\s*", r" \1 ", s)
+    s = _CITY_DISTRICT_PAREN_RE.sub(r" \1 ", s)
     return s.replace(" ", "").replace("-", "")
 
 
@@ -81,11 +100,11 @@ def _city_tokens(s: str) -> set:
     s = _fix_mojibake(s)
     s = s.lower().strip()
     s = s.replace("ä", "ae").replace("ö", "oe").replace("ü", "ue").replace("ß", "ss")
-    parts = re.split(r"[\s/,]+", s)
+    parts = _CITY_SPLIT_RE.split(s)
     # Remove parentheses content kept as token for Wien (12)
     tokens = []
     for p in parts:
-        p = re.sub(r"^\(|\)$", "", p).strip()
+        p = _PAREN_EDGE_RE.sub("", p).strip()
         if p and len(p) >= 2 and p not in _CITY_STOPWORDS:
             tokens.append(p)
     return set(tokens)
@@ -96,10 +115,10 @@ def _plz_digits_only(plz_val: str) -> str:
     if not plz_val:
         return ""
     s = str(plz_val).strip().replace(".0", "")
-    m = re.search(r"[A-Z]+-\s*(\d{4,5})\b", s, re.IGNORECASE)
+    m = _PLZ_PREFIXED_RE.search(s)
     if m:
         return m.group(1)
-    return re.sub(r"\D", "", s) or s
+    return _NON_DIGIT_RE.sub("", s) or s
 
 
 def _city_matches(ort_db_val: str, addr: str) -> bool:
@@ -113,17 +132,52 @@ def _city_matches(ort_db_val: str, addr: str) -> bool:
     if ort_norm and ort_norm in addr:
         return True
     if "wien" in (ort_norm or ""):
-        district = re.search(r"\d+", ort_norm)
+        district = _DIGITS_RE.search(ort_norm)
         if district:
             return "wien" in addr and district.group(0) in addr
     return False
 
 
+def _excel_cache_path(path: str) -> str:
+    """Cache file next to the resolved workbook, independent of the current working directory."""
+    return os.path.abspath(path) + ".cache.pkl"
+
+
+def _excel_cache_key(path: str) -> tuple:
+    st = os.stat(path)
+    return (_EXCEL_CACHE_VERSION, st.st_mtime_ns, st.st_size)
+
+
+def _read_excel_disk_cache(cache_path: str, key: tuple) -> Optional[pd.DataFrame]:
+    try:
+        with open(cache_path, "rb") as f:
+            cached = pickle.load(f)
+    except Exception:
+        return None
+    if not isinstance(cached, dict) or cached.get("key") != key:
+        return None
+    return cached.get("df")
+
+
+def _write_excel_disk_cache(cache_path: str, key: tuple, df: pd.DataFrame) -> None:
+    try:
+        with open(cache_path, "wb") as f:
+            pickle.dump({"key": key, "df": df}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        print(f"Could not write Excel cache {cache_path}: {e}")
+
+
 def load_data():
     global _excel_cache
     if _excel_cache is None:
         if os.path.exists(EXCEL_PATH):
             try:
+                cache_path = _excel_cache_path(EXCEL_PATH)
+                key = _excel_cache_key(EXCEL_PATH)
+                _excel_cache = _read_excel_disk_cache(cache_path, key)
+                if _excel_cache is not None:
+                    print(f"Loaded {len(_excel_cache)} customer records from cache.")
+                    return _excel_cache
                 _excel_cache = pd.read_excel(EXCEL_PATH, engine="pyxlsb")
                 # Pre-process: ensure PLZ is clean string
                 if "Postleitzahl" in _excel_cache.columns:
@@ -131,6 +185,7 @@ def load_data():
                 # Fill NaNs
                 _excel_cache = _excel_cache.fillna("")
                 print(f"Loaded {len(_excel_cache)} customer records from Excel.")
+                _write_excel_disk_cache(cache_path, key, _excel_cache)
             except Exception as e:
                 print(f"Error loading Excel data: {e}")
         else:
@@ -169,10 +224,10 @@ def load_iln_data():
 def _extract_plz_from_address(address_str: str) -> str:
     if not address_str:
         return ""
-    plz_match = re.search(r"[A-Z]+-\s*(\d{4,5})\b", address_str, re.IGNORECASE)
+    plz_match = _PLZ_PREFIXED_RE.search(address_str)
     if plz_match:
         return plz_match.group(1)
-    all_matches = re.findall(r"\b(\d{4,5})\b", address_str)
+    all_matches = _PLZ_ANY_RE.findall(address_str)
     if all_matches:
         return max(all_matches, key=lambda x: (len(x) == 5, len(x)))
     return ""
@@ -183,7 +238,7 @@ def _normalize_loose_alnum(text: str) -> str:
         return ""
     text = _fix_mojibake(text).lower()
     text = text.replace("ä", "ae").replace("ö", "oe").replace("ü", "ue").replace("ß", "ss")
-    return " ".join(re.findall(r"[a-z0-9]+", text))
+    return " ".join(_ALNUM_TOKEN_RE.findall(text))
 
 
 def _extract_house_number_tokens(text: str) -> Set[str]:
@@ -191,7 +246,7 @@ def _extract_house_number_tokens(text: str) -> Set[str]:
         return set()
     text = _fix_mojibake(text).lower()
     text = text.replace("ä", "ae").replace("ö", "oe").replace("ü", "ue").replace("ß", "ss")
-    return set(re.findall(r"\b\d{1,4}[a-z]?\b", text))
+    return set(_HOUSE_NUMBER_RE.findall(text))
 
 
 def _street_tokens(text: str) -> List[str]:
@@ -199,26 +254,32 @@ def _street_tokens(text: str) -> List[str]:
         return []
     s = _fix_mojibake(text).lower()
     s = s.replace("ä", "ae").replace("ö", "oe").replace("ü", "ue").replace("ß", "ss")
-    toks = re.findall(r"[a-z0-9]+", s)
+    toks = _ALNUM_TOKEN_RE.findall(s)
     stop = {"blvd", "str", "strasse", "street", "ul", "ulitsa", "evropa"}
     return [t for t in toks if len(t) >= 3 and t not in stop]
 
 
+_TOKEN_MATCH_MIN_RATIO = 0.84
+
+
 def _token_coverage_score(row_tokens: List[str], input_tokens: List[str]) -> float:
     if not row_tokens or not input_tokens:
         return 0.0
     matched = 0
     for rt in row_tokens:
-        best = 0.0
         for it in input_tokens:
             if rt == it:
-                best = 1.0
+                matched += 1
+                break
+            # ratio() <= 2*min(len)/(len sum): skip pairs whose lengths alone rule out a match,
+            # then let SequenceMatcher's cheap upper bound reject before the full comparison.
+            total = len(rt) + len(it)
+            if 2 * min(len(rt), len(it)) < _TOKEN_MATCH_MIN_RATIO * total:
+                continue
+            sm = SequenceMatcher(None, rt, it)
+            if sm.quick_ratio() >= _TOKEN_MATCH_MIN_RATIO and sm.ratio() >= _TOKEN_MATCH_MIN_RATIO:
+                matched += 1
                 break
-            sim = SequenceMatcher(None, rt, it).ratio()
-            if sim > best:
-                best = sim
-        if best >= 0.84:
-            matched += 1
     return matched / len(row_tokens)
 
 
@@ -229,7 +290,7 @@ def _clean_kdnr(value: Any) -> str:
 
 def _kdnr_sort_value(value: Any) -> int:
     cleaned = _clean_kdnr(value)
-    digits = re.sub(r"\D", "", cleaned)
+    digits = _NON_DIGIT_RE.sub("", cleaned)
     if not digits:
         return 10**9
     try:
@@ -238,6 +299,57 @@ def _kdnr_sort_value(value: Any) -> int:
         return 10**9
 
 
+# Preprocessed allowlist rows for find_momax_bg_customer_by_address, rebuilt when load_data() changes
+_momax_bg_rows_cache: Optional[List[Dict[str, Any]]] = None
+_momax_bg_rows_source: Optional[pd.DataFrame] = None
+
+
+def _momax_bg_allowlist_rows(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Allowlisted momax_bg rows (Adressnummer 0, Verband filter) with their address keys pre-normalized."""
+    global _momax_bg_rows_cache, _momax_bg_rows_source
+    if _momax_bg_rows_cache is not None and _momax_bg_rows_source is df:
+        return _momax_bg_rows_cache
+
+    rows: List[Dict[str, Any]] = []
+    if "Adressnummer" in df.columns and "Kundennummer" in df.columns:
+        subset = df[
+            df["Adressnummer"].astype(str).str.replace(".0", "", regex=False).str.strip() == "0"
+        ]
+        subset = _filter_by_verband(subset)
+        if subset is not None and not subset.empty:
+            allowed = {_clean_kdnr(v) for v in MOMAX_BG_ALLOWED_KUNDENNUMMERN}
+            subset = subset[
+                subset["Kundennummer"]
+                .astype(str)
+                .str.replace(".0", "", regex=False)
+                .str.strip()
+                .apply(_clean_kdnr)
+                .isin(allowed)
+            ]
+            for _, row in subset.iterrows():
+                strasse_db = str(row.get("Strasse", ""))
+                ort_db = str(row.get("Ort", ""))
+                if len(strasse_db) < 3 or len(ort_db) < 3:
+                    continue
+                rows.append(
+                    {
+                        "row": row,
+                        "ort_db": ort_db,
+                        "strasse_clean": _normalize_address_token(strasse_db),
+                        "ort_clean": _normalize_city(ort_db),
+                        "street_loose": _normalize_loose_alnum(strasse_db),
+                        "house_tokens": _extract_house_number_tokens(strasse_db),
+                        "street_tokens": _street_tokens(strasse_db),
+                        "plz_db": _plz_digits_only(str(row.get("Postleitzahl", "")).replace(".0", "").strip()),
+                        "kdnr_sort": _kdnr_sort_value(row.get("Kundennummer", "")),
+                    }
+                )
+
+    _momax_bg_rows_cache = rows
+    _momax_bg_rows_source = df
+    return rows
+
+
 def find_momax_bg_customer_by_address(
     address_str: str,
     warnings: Optional[List[str]] = None,
@@ -246,46 +358,71 @@ def find_momax_bg_customer_by_address(
     momax_bg-only customer lookup constrained to a fixed Kundennummer allowlist.
     Match by address/street with typo-tolerant fallback.
     """
-    df = load_data()
-    if df is None or not address_str or not address_str.strip():
-        return None
-    if "Adressnummer" not in df.columns or "Kundennummer" not in df.columns:
+    if not address_str or not address_str.strip():
         return None
+    return find_momax_bg_customers_batch([address_str])[0]
 
-    subset = df[
-        df["Adressnummer"].astype(str).str.replace(".0", "", regex=False).str.strip() == "0"
-    ]
-    subset = _filter_by_verband(subset)
-    if subset is None or subset.empty:
-        return None
 
-    subset = subset[
-        subset["Kundennummer"]
-        .astype(str)
-        .str.replace(".0", "", regex=False)
-        .str.strip()
-        .apply(_clean_kdnr)
-        .isin({_clean_kdnr(v) for v in MOMAX_BG_ALLOWED_KUNDENNUMMERN})
-    ]
-    if subset.empty:
-        return None
+def find_momax_bg_customers_batch(addresses: List[str]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Batch form of find_momax_bg_customer_by_address: one result (or None) per input address.
+    Street similarity for all queries x allowlist rows is computed in a single rapidfuzz cdist call.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(addresses)
+    df = load_data()
+    if df is None:
+        return results
+    rows = _momax_bg_allowlist_rows(df)
+    if not rows:
+        return results
+
+    queries = [a.strip() if isinstance(a, str) else "" for a in addresses]
+    queries_loose = [_normalize_loose_alnum(q) for q in queries]
+    scores_by_query = _momax_bg_fuzzy_scores(queries_loose, rows)
+    for pos, query in enumerate(queries):
+        if query:
+            results[pos] = _match_momax_bg_row(query, queries_loose[pos], rows, scores_by_query[pos])
+    return results
+
+
+def _momax_bg_fuzzy_scores(queries_loose: List[str], rows: List[Dict[str, Any]]) -> List[Dict[int, float]]:
+    """token_set_ratio of each query against each allowlist street, as {row index: score} per query."""
+    scores: List[Dict[int, float]] = [{} for _ in queries_loose]
+    if fuzz is None or process is None:
+        return scores
+    row_idx = [i for i, entry in enumerate(rows) if entry["street_loose"]]
+    query_idx = [i for i, q in enumerate(queries_loose) if q]
+    if not row_idx or not query_idx:
+        return scores
+    matrix = process.cdist(
+        [queries_loose[i] for i in query_idx],
+        [rows[i]["street_loose"] for i in row_idx],
+        scorer=fuzz.token_set_ratio,
+        processor=None,
+        dtype=np.float64,
+        workers=-1 if len(query_idx) > 1 else 1,
+    )
+    for qi, row_scores in zip(query_idx, matrix.tolist()):
+        scores[qi] = dict(zip(row_idx, row_scores))
+    return scores
 
-    address_str = address_str.strip()
+
+def _match_momax_bg_row(
+    address_str: str,
+    input_street_loose: str,
+    rows: List[Dict[str, Any]],
+    fuzzy_scores: Dict[int, float],
+) -> Optional[Dict[str, Any]]:
     addr_clean = _normalize_address_token(address_str)
     input_plz = _extract_plz_from_address(address_str)
-    input_street_loose = _normalize_loose_alnum(address_str)
     input_house_tokens = _extract_house_number_tokens(address_str)
+    input_tokens = _street_tokens(address_str)
 
     candidates: List[Dict[str, Any]] = []
-    for _, row in subset.iterrows():
-        strasse_db = str(row.get("Strasse", ""))
-        ort_db = str(row.get("Ort", ""))
-        if len(strasse_db) < 3 or len(ort_db) < 3:
-            continue
-
-        strasse_clean = _normalize_address_token(strasse_db)
-        ort_clean = _normalize_city(ort_db)
-        city_match = bool(ort_clean and (ort_clean in addr_clean or _city_matches(ort_db, addr_clean)))
+    for idx, entry in enumerate(rows):
+        strasse_clean = entry["strasse_clean"]
+        ort_clean = entry["ort_clean"]
+        city_match = bool(ort_clean and (ort_clean in addr_clean or _city_matches(entry["ort_db"], addr_clean)))
         if not city_match:
             continue
 
@@ -294,21 +431,16 @@ def find_momax_bg_customer_by_address(
             or (strasse_clean.startswith("am") and len(strasse_clean) > 2 and strasse_clean[2:] in addr_clean)
         )
 
-        row_street_loose = _normalize_loose_alnum(strasse_db)
-        fuzzy_score = 0.0
-        if fuzz is not None and input_street_loose and row_street_loose:
-            fuzzy_score = float(fuzz.token_set_ratio(input_street_loose, row_street_loose))
+        fuzzy_score = fuzzy_scores.get(idx, 0.0) if fuzz is not None else 0.0
 
-        row_house_tokens = _extract_house_number_tokens(strasse_db)
+        row_house_tokens = entry["house_tokens"]
         house_match = bool(
             row_house_tokens
             and input_house_tokens
             and not row_house_tokens.isdisjoint(input_house_tokens)
         )
 
-        row_tokens = _street_tokens(strasse_db)
-        input_tokens = _street_tokens(address_str)
-        token_coverage = _token_coverage_score(row_tokens, input_tokens)
+        token_coverage = _token_coverage_score(entry["street_tokens"], input_tokens)
 
         fuzzy_accept = bool(
             not street_matches
@@ -324,19 +456,18 @@ def find_momax_bg_customer_by_address(
         if not street_matches and not fuzzy_accept and not token_accept:
             continue
 
-        plz_db = _plz_digits_only(str(row.get("Postleitzahl", "")).replace(".0", "").strip())
-        plz_exact = bool(input_plz and plz_db == input_plz)
+        plz_exact = bool(input_plz and entry["plz_db"] == input_plz)
 
         rank_score = fuzzy_score if fuzz is not None else (token_coverage * 100.0)
 
         candidates.append(
             {
-                "row": row,
+                "row": entry["row"],
                 "strict": street_matches,
                 "plz_exact": plz_exact,
                 "house_match": house_match,
                 "fuzzy_score": rank_score,
-                "kdnr_sort": _kdnr_sort_value(row.get("Kundennummer", "")),
+                "kdnr_sort": entry["kdnr_sort"],
             }
         )
 
@@ -438,14 +569,14 @@ def find_customer_by_address(
     # Normalize country codes (e.g., "RO-300645" → "300645") and use exact matching
     plz = None
     # First try: match country code format (RO-300645, D-75177, etc.) - one or more letters
-    plz_match = re.search(r"[A-Z]+-\s*(\d{4,5})\b", address_str, re.IGNORECASE)
+    plz_match = _PLZ_PREFIXED_RE.search(address_str)
     if plz_match:
         # Extract just the digits (normalize "RO-300645" → "300645")
         plz = plz_match.group(1)
     else:
         # Fallback: match standalone 4-5 digit numbers (but prefer longer ones)
         # This handles cases where PLZ doesn't have country prefix
-        all_matches = re.findall(r"\b(\d{4,5})\b", address_str)
+        all_matches = _PLZ_ANY_RE.findall(address_str)
         if all_matches:
             # Prefer 5-digit codes (German postal codes are 5 digits)
             # If multiple matches, take the longest one that's 4-5 digits
@@ -532,7 +663,7 @@ def find_customer_by_address(
             if not isinstance(t, str):
                 return set()
             t = _normalize_address_token(t)
-            return set(re.findall(r"[a-z0-9]+", t)) - {"gmbh", "co", "kg", "und"}
+            return set(_ALNUM_TOKEN_RE.findall(t)) - {"gmbh", "co", "kg", "und"}
 
         iln_tokens = _company_tokens(iln_company)
         if iln_tokens:
@@ -556,7 +687,7 @@ def find_customer_by_address(
         def _get_tokens(t: str) -> list:
             if not isinstance(t, str):
                 return []
-            parts = re.split(r"[^a-z0-9äöüß]+", t.lower())
+            parts = _NAME_SPLIT_RE.split(t.lower())
             stop = {"gmbh", "co", "kg", "und", "der", "die", "das"}
             return [p for p in parts if len(p) >= 3 and p not in stop]
 
@@ -594,7 +725,7 @@ def find_customer_by_address(
         def get_tokens(text):
             if not isinstance(text, str):
                 return []
-            parts = re.split(r"[^a-z0-9äöüß]+", text.lower())
+            parts = _NAME_SPLIT_RE.split(text.lower())
             stop = {"gmbh", "co", "kg", "und", "der", "die", "das"}
             return [p for p in parts if len(p) >= 3 and p not in stop]
 
@@ -693,11 +824,11 @@ def find_iln_by_address(address_str: str) -> Optional[str]:
     addr_clean = _normalize_address_token(address_str)
     
     plz = None
-    plz_match = re.search(r"[A-Z]+-\s*(\d{4,5})\b", address_str, re.IGNORECASE)
+    plz_match = _PLZ_PREFIXED_RE.search(address_str)
     if plz_match:
         plz = plz_match.group(1)
     else:
-        plz_match = re.search(r"\b(\d{4,5})\b", address_str)
+        plz_match = _PLZ_ANY_RE.search(address_str)
         plz = plz_match.group(1) if plz_match else None
 
     scored_candidates = []
@@ -827,7 +958,7 @@ def find_kundennummer_by_iln(iln_value: str) -> Optional[str]:
         return None
     # If ILN Excel had a Kundennummer column we would use it here
     # Derive candidate from ILN number: last 5 digits (e.g. 40065920000027566 -> 27566)
-    digits = re.sub(r"\D", "", iln_clean)
+    digits = _NON_DIGIT_RE.sub("", iln_clean)
     if len(digits) < 4:
         return None
     candidate = digits[-5:] if len(digits) >= 5 else digits
@@ -5,13 +5,20 @@ from datetime import datetime, timezone
 import time
 import json
 import sys
+from typing import Any
 
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Falls back to stdlib json
+
 from config import Config
 from email_ingest import EmailClient
 from openai_extract import OpenAIExtractor
 from pipeline import process_message
+from reply_email import SMTPSession
 import xml_exporter
 
 
@@ -26,6 +33,20 @@ def _resolve_output_path(output_dir: Path, base_name: str) -> Path:
     return output_dir / f"{base_name}_overflow.json"
 
 
+def write_json_output(path: Path, data: Any) -> None:
+    if orjson is not None:
+        try:
+            payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            # orjson rejects values json accepts (float/int subclasses, ints wider than 64 bits); let json write them.
+            pass
+        else:
+            path.write_bytes(payload)
+            return
+    with path.open("w", encoding="utf-8") as handle:
+        json.dump(data, handle, ensure_ascii=False, indent=2)
+
+
 def _validate_config(config: Config) -> list[str]:
     missing = []
     if not config.openai_api_key:
@@ -100,22 +121,23 @@ def main() -> int:
             time.sleep(poll_seconds)
             continue
 
-        for message in new_messages:
-            result = process_message(message, config, extractor)
-            output_path = _resolve_output_path(config.output_dir, result.output_name)
-            with output_path.open("w", encoding="utf-8") as handle:
-                json.dump(result.data, handle, ensure_ascii=False, indent=2)
-            print(f"Saved: {output_path}")
-
-            # Generate XML outputs
-            try:
-                xml_paths = xml_exporter.export_xmls(result.data, result.output_name, config, config.output_dir)
-                for xp in xml_paths:
-                    print(f"Generated XML: {xp}")
-            except Exception as exc:
-                print(f"Failed to generate XMLs for {result.output_name}: {exc}")
-
-            seen_message_ids.add(message.message_id)
+        # One SMTP connection per batch; it only connects if a reply email is actually sent.
+        with SMTPSession(config) as smtp_session:
+            for message in new_messages:
+                result = process_message(message, config, extractor, smtp_session=smtp_session)
+                output_path = _resolve_output_path(config.output_dir, result.output_name)
+                write_json_output(output_path, result.data)
+                print(f"Saved: {output_path}")
+
+                # Generate XML outputs
+                try:
+                    xml_paths = xml_exporter.export_xmls(result.data, result.output_name, config, config.output_dir)
+                    for xp in xml_paths:
+                        print(f"Generated XML: {xp}")
+                except Exception as exc:
+                    print(f"Failed to generate XMLs for {result.output_name}: {exc}")
+
+                seen_message_ids.add(message.message_id)
 
         if poll_seconds <= 0:
             return 0
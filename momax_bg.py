@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from collections import OrderedDict
+import hashlib
 import re
 import unicodedata
 from typing import Any
@@ -9,6 +11,7 @@ import fitz  # PyMuPDF
 import openai_extract
 from email_ingest import Attachment, IngestedEmail
 from openai_extract import ImageInput, OpenAIExtractor
+from prompts import ORDER_OUTPUT_SCHEMA
 from prompts_momax_bg import build_user_instructions_momax_bg
 
 
@@ -32,19 +35,48 @@ def _first_page_text(pdf_bytes: bytes) -> str:
         doc.close()
 
 
+# First-page text keyed by a digest of the PDF bytes, so detection, kom_nr and order-date
+# extraction on the same attachments share one MuPDF pass. Small LRU; texts are short.
+_PDF_TEXT_CACHE: "OrderedDict[bytes, str]" = OrderedDict()
+_PDF_TEXT_CACHE_MAX = 128
+
+
+def _cached_first_page_text(pdf_bytes: bytes) -> str:
+    key = hashlib.blake2b(pdf_bytes, digest_size=16).digest()
+    text = _PDF_TEXT_CACHE.get(key)
+    if text is not None:
+        _PDF_TEXT_CACHE.move_to_end(key)
+        return text
+    text = _first_page_text(pdf_bytes)
+    _PDF_TEXT_CACHE[key] = text
+    if len(_PDF_TEXT_CACHE) > _PDF_TEXT_CACHE_MAX:
+        _PDF_TEXT_CACHE.popitem(last=False)
+    return text
+
+
 _BG_KOM_WITH_DATE_RE = re.compile(
     r"(?<!\d)(\d{3,12})/(\d{2}\.\d{2}\.\d{2})(?=[^0-9]|$)"
 )
 
 
+# BG markers, matched against lowercased, accent-stripped text.
+_BG_RECIPIENT_RE = re.compile(r"\bmoe?max\s+bulgaria\b")
+_BG_ORDER_HEADING_RE = re.compile(r"\bmoe?max\s*-\s*order\b")
+_BG_TERM_OF_DELIVERY_RE = re.compile(r"\bterm\s+(?:for|of)\s+delivery\b")
+
+
+def _order_candidates_from_text(combined: str) -> list[tuple[str, str]]:
+    return [(m.group(1), m.group(2)) for m in _BG_KOM_WITH_DATE_RE.finditer(combined)]
+
+
 def _extract_momax_bg_order_candidates(attachments: list[Attachment]) -> list[tuple[str, str]]:
     pdfs = [a for a in attachments if _is_pdf_attachment(a)]
     if not pdfs:
         return []
-    combined = "\n".join(_first_page_text(p.data) for p in pdfs).strip()
+    combined = "\n".join(_cached_first_page_text(p.data) for p in pdfs).strip()
     if not combined:
         return []
-    return [(m.group(1), m.group(2)) for m in _BG_KOM_WITH_DATE_RE.finditer(combined)]
+    return _order_candidates_from_text(combined)
 
 
 def extract_momax_bg_kom_nr(attachments: list[Attachment]) -> str:
@@ -93,7 +125,7 @@ def is_momax_bg_two_pdf_case(attachments: list[Attachment]) -> bool:
         if not pdfs:
             return False
 
-        combined_raw = "\n".join(_first_page_text(p.data) for p in pdfs).strip()
+        combined_raw = "\n".join(_cached_first_page_text(p.data) for p in pdfs).strip()
         if not combined_raw:
             return False
 
@@ -102,10 +134,11 @@ def is_momax_bg_two_pdf_case(attachments: list[Attachment]) -> bool:
         combined = "".join(ch for ch in combined if not unicodedata.combining(ch))
 
         # Handle MOEMAX/MOMAX variants after NFKD normalization.
-        has_bg = re.search(r"\bmoe?max\s+bulgaria\b", combined) is not None
-        has_order = re.search(r"\bmoe?max\s*-\s*order\b", combined) is not None
-        has_term = re.search(r"\bterm\s+(?:for|of)\s+delivery\b", combined) is not None
-        has_kom = bool(extract_momax_bg_kom_nr(attachments))
+        has_bg = _BG_RECIPIENT_RE.search(combined) is not None
+        has_order = _BG_ORDER_HEADING_RE.search(combined) is not None
+        has_term = _BG_TERM_OF_DELIVERY_RE.search(combined) is not None
+        # Reuse the text already extracted above instead of re-opening every PDF.
+        has_kom = bool(_order_candidates_from_text(combined_raw))
 
         return bool(has_bg and has_order and has_term and has_kom)
     except Exception:
@@ -149,5 +182,5 @@ def extract_momax_bg(
         )
         content.append({"type": "input_image", "image_url": image.data_url})
 
-    response = extractor._create_response(content)
+    response = extractor._create_response(content, json_schema=ORDER_OUTPUT_SCHEMA)
     return openai_extract._response_to_text(response)
@@ -7,6 +7,7 @@ from dateutil.parser import parse, ParserError
 import datetime
 
 import lookup
+from prompts import split_article_code
 
 
 HEADER_FIELDS = [
@@ -431,6 +432,33 @@ def _normalize_items(items: list[dict[str, Any]], dayfirst: bool, warnings: list
         items[idx - 1] = item
 
 
+_COMBINED_CODE_RE = re.compile(r"[-/+ ]")
+
+
+def _split_combined_article_codes(items: list[dict[str, Any]]) -> None:
+    """
+    Deterministic fallback for the universal article rule: if the LLM left a combined code
+    (e.g. 'CQ9606XA-60951') in artikelnummer with an empty modellnummer, split it in Python.
+    """
+    for item in items:
+        art_entry = item.get("artikelnummer")
+        mod_entry = item.get("modellnummer")
+        if not isinstance(art_entry, dict) or not isinstance(mod_entry, dict):
+            continue
+        art_val = art_entry.get("value") or ""
+        if mod_entry.get("value") or not _COMBINED_CODE_RE.search(art_val):
+            continue
+        artikelnummer, modellnummer = split_article_code(art_val)
+        # Short fragments ('A-2') are not combined codes; leave those for review.
+        if len(artikelnummer) < 3 or len(modellnummer) < 3:
+            continue
+        art_entry["value"] = artikelnummer
+        mod_entry["value"] = modellnummer
+        mod_entry["source"] = art_entry.get("source", "derived")
+        mod_entry["confidence"] = art_entry.get("confidence", 0.0)
+        mod_entry["derived_from"] = "article_code_split"
+
+
 def _propagate_furncloud_id(items: list[dict[str, Any]], warnings: list[str]) -> None:
     values: list[str] = []
     for item in items:
@@ -859,6 +887,9 @@ def normalize_output(
         items = []
     data["items"] = items
     _normalize_items(items, dayfirst, warnings)
+    if not is_momax_bg:
+        # momax_bg Code/Type values follow their own slash rule (see prompts_momax_bg).
+        _split_combined_article_codes(items)
     _propagate_furncloud_id(items, warnings)
     apply_program_furncloud_to_items(data, warnings)
 
@@ -6,8 +6,14 @@ from typing import Any
 
 from openai import OpenAI
 
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Falls back to stdlib json
+
 from prompts import (
     ORDER_FORMAT_CLASSIFIER_SYSTEM_PROMPT,
+    ORDER_OUTPUT_SCHEMA,
     SYSTEM_PROMPT,
     build_order_format_classifier_instructions,
     build_user_instructions,
@@ -76,6 +82,7 @@ class OpenAIExtractor:
         self.model = model
         self.max_output_tokens = max_output_tokens
         self._supports_response_format = True
+        self._supports_json_schema = True
 
     def extract(
         self,
@@ -117,7 +124,7 @@ class OpenAIExtractor:
             )
             content.append({"type": "input_image", "image_url": image.data_url})
 
-        response = self._create_response(content)
+        response = self._create_response(content, json_schema=ORDER_OUTPUT_SCHEMA)
 
         return _response_to_text(response)
 
@@ -188,14 +195,21 @@ class OpenAIExtractor:
         response = self._create_response_with_prompt(content, system_prompt)
         return _response_to_text(response)
 
-    def _create_response(self, content: list[dict[str, Any]]) -> Any:
+    def _create_response(
+        self, content: list[dict[str, Any]], json_schema: dict[str, Any] | None = None
+    ) -> Any:
         """Create response using the default SYSTEM_PROMPT."""
-        return self._create_response_with_prompt(content, SYSTEM_PROMPT)
+        return self._create_response_with_prompt(content, SYSTEM_PROMPT, json_schema)
 
-    def _create_response_with_prompt(self, content: list[dict[str, Any]], system_prompt: str) -> Any:
-        """Create response using a specified system prompt."""
+    def _create_response_with_prompt(
+        self,
+        content: list[dict[str, Any]],
+        system_prompt: str,
+        json_schema: dict[str, Any] | None = None,
+    ) -> Any:
+        """Create response using a specified system prompt (optionally schema-constrained)."""
         try:
-            return self._responses_create_with_prompt(content, system_prompt)
+            return self._responses_create_with_prompt(content, system_prompt, json_schema)
         except AttributeError:
             return self._chat_fallback_with_prompt(content, system_prompt)
 
@@ -225,7 +239,12 @@ class OpenAIExtractor:
             message = str(exc)
             raise
 
-    def _responses_create_with_prompt(self, content: list[dict[str, Any]], system_prompt: str) -> Any:
+    def _responses_create_with_prompt(
+        self,
+        content: list[dict[str, Any]],
+        system_prompt: str,
+        json_schema: dict[str, Any] | None = None,
+    ) -> Any:
         """Use responses API with custom system prompt."""
         params: dict[str, Any] = {
             "model": self.model,
@@ -237,6 +256,16 @@ class OpenAIExtractor:
         }
         if self._supports_response_format:
             params["response_format"] = {"type": "json_object"}
+        if json_schema is not None and self._supports_json_schema:
+            # Structured output: the schema is enforced by constrained decoding on the provider side.
+            params["text"] = {
+                "format": {
+                    "type": "json_schema",
+                    "name": "order_extraction",
+                    "schema": json_schema,
+                    "strict": False,
+                }
+            }
 
         try:
             return self.client.responses.create(**params)
@@ -245,7 +274,11 @@ class OpenAIExtractor:
             if "response_format" in message:
                 self._supports_response_format = False
                 params.pop("response_format", None)
-                return self.client.responses.create(**params)
+                return self._responses_create_with_prompt(content, system_prompt, json_schema)
+            if "'text'" in message:
+                self._supports_json_schema = False
+                params.pop("text", None)
+                return self._responses_create_with_prompt(content, system_prompt, json_schema)
             raise
         except Exception as exc:
             message = str(exc)
@@ -254,17 +287,31 @@ class OpenAIExtractor:
                 self._supports_response_format = False
                 params.pop("response_format", None)
                 retried = True
+            if "text.format" in message and ("Unsupported parameter" in message or "Invalid" in message):
+                self._supports_json_schema = False
+                params.pop("text", None)
+                retried = True
             if retried:
                 return self.client.responses.create(**params)
             raise
 
 
+def _loads(text: str) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            # orjson rejects some input json accepts (e.g. NaN/Infinity); let json decide.
+            pass
+    return json.loads(text)
+
+
 def parse_json_response(text: str) -> dict[str, Any]:
     try:
-        return json.loads(text)
+        return _loads(text)
     except json.JSONDecodeError:
         start = text.find("{")
         end = text.rfind("}")
         if start == -1 or end == -1 or end <= start:
             raise
-        return json.loads(text[start : end + 1])
+        return _loads(text[start : end + 1])
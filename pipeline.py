@@ -16,6 +16,8 @@ from email_ingest import Attachment, IngestedEmail
 from normalize import normalize_output, refresh_missing_warnings
 from openai_extract import ImageInput, OpenAIExtractor, parse_json_response
 from poppler_utils import pdf_to_images, resolve_pdftoppm
+from prompts import LABEL_PATTERNS
+from prompts_detail import derive_prog_id, resolve_manufacturer_iln
 import reply_email
 
 import ai_customer_match
@@ -190,9 +192,12 @@ def _merge_article_details(base_data: dict[str, Any], detail_data: dict[str, Any
     Merge detailed article info from second extraction into the base extraction.
     Adds program info and detailed article data (full IDs, descriptions, dimensions, remarks).
     """
-    # Add program info if available
-    if "program" in detail_data and detail_data["program"]:
-        base_data["program"] = detail_data["program"]
+    # Add program info if available; manufacturer_iln and prog_id are deterministic, so derive them here, not by the LLM
+    program = detail_data.get("program")
+    if isinstance(program, dict) and program:
+        program["manufacturer_iln"] = resolve_manufacturer_iln(str(program.get("manufacturer_name", "") or ""))
+        program["prog_id"] = derive_prog_id(str(program.get("program_name", "") or ""))
+        base_data["program"] = program
     
     # Add articles array if available (used by xml_exporter for detailed output)
     if "articles" in detail_data and detail_data["articles"]:
@@ -223,8 +228,28 @@ def _attachment_summaries(attachments: list[Attachment]) -> list[str]:
     return summaries
 
 
+def _classify_order_format_fast(subject: str, body_text: str) -> dict[str, Any] | None:
+    """
+    Deterministic pre-check for the order format classifier.
+    Returns a classification when exactly one format's primary signal is present
+    ('Lagerbestellung' vs a 'Komm:' label); otherwise None so the LLM classifier decides.
+    ILN-Anl/ILN-Fil are not used: branch Lagerbestellung emails carry them too.
+    """
+    text = f"{subject}\n{body_text}"
+    is_branch = "lagerbestellung" in text.lower()
+    is_standard = LABEL_PATTERNS["komm"].search(text) is not None
+    if is_branch == is_standard:
+        return None
+    if is_branch:
+        return {"format": "momax_branch", "confidence": 0.95, "reason": "fast path: 'Lagerbestellung' present"}
+    return {"format": "standard_xxxlutz", "confidence": 0.95, "reason": "fast path: 'Komm:' label present"}
+
+
 def process_message(
-    message: IngestedEmail, config: Config, extractor: OpenAIExtractor
+    message: IngestedEmail,
+    config: Config,
+    extractor: OpenAIExtractor,
+    smtp_session: reply_email.SMTPSession | None = None,
 ) -> ProcessedResult:
     warnings: list[str] = []
     body_text = message.body_text or ""
@@ -240,14 +265,16 @@ def process_message(
 
     if not use_momax_bg:
         try:
-            classification = extractor.classify_order_format(
-                message_id=message.message_id,
-                received_at=message.received_at,
-                email_text=body_text,
-                subject=message.subject,
-                sender=message.sender,
-                attachment_summaries=_attachment_summaries(message.attachments),
-            )
+            classification = _classify_order_format_fast(message.subject or "", body_text)
+            if classification is None:
+                classification = extractor.classify_order_format(
+                    message_id=message.message_id,
+                    received_at=message.received_at,
+                    email_text=body_text,
+                    subject=message.subject,
+                    sender=message.sender,
+                    attachment_summaries=_attachment_summaries(message.attachments),
+                )
             if isinstance(classification, dict):
                 classified_format = str(classification.get("format", "")).strip().lower()
                 if classified_format in {"standard_xxxlutz", "momax_branch"}:
@@ -454,7 +481,7 @@ def process_message(
                 to_addr=config.reply_email_to,
                 body_template=config.reply_email_body,
             )
-            reply_email.send_email_via_smtp(config, msg)
+            reply_email.send_email_via_smtp(config, msg, session=smtp_session)
             w = normalized.get("warnings")
             if isinstance(w, list):
                 w.append(f"Auto-reply email sent to {config.reply_email_to}.")
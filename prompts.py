@@ -5,6 +5,14 @@ Handles two formats:
 2. Email body only (MÖMAX branch/Lagerbestellung orders)
 """
 
+from functools import lru_cache
+from typing import Any
+import hashlib
+import json
+import re
+
+from prompts_shared import build_source_priority_block, normalize_prompt_whitespace
+
 SYSTEM_PROMPT = (
     "You are an expert order extraction system for XXLUTZ/MÖMAX furniture orders. "
     "You extract structured data from order documents (emails, PDFs, images) into a consistent JSON schema. "
@@ -16,19 +24,212 @@ SYSTEM_PROMPT = (
     "4. Return ONLY valid JSON matching the required structure"
 )
 
+SYSTEM_PROMPT = normalize_prompt_whitespace(SYSTEM_PROMPT)
+
+# Content hash of SYSTEM_PROMPT as the first line: any prompt edit changes the cached prefix,
+# so provider-side prompt caches are invalidated on deploy instead of serving the old prompt.
+_PROMPT_VERSION = hashlib.blake2b(SYSTEM_PROMPT.encode("utf-8"), digest_size=6).hexdigest()
+SYSTEM_PROMPT = f"# prompt-version: {_PROMPT_VERSION}\n" + SYSTEM_PROMPT
+
+# Pre-compiled patterns for the email labels described in the prompts below.
+# Python-side checks should use these instead of re-compiling inline patterns per call.
+# Group 1 captures the labeled value.
+LABEL_PATTERNS: dict[str, re.Pattern[str]] = {
+    name: re.compile(pattern, re.IGNORECASE | re.MULTILINE)
+    for name, pattern in [
+        ("kdnr", r"\bKDNR\s*:\s*(\S+)"),
+        ("komm", r"\bKomm\.?\s*:\s*([A-Z0-9][A-Z0-9-]*)"),
+        ("iln_anl", r"\bILN-Anl\s*:\s*(\d{13})"),
+        ("iln_fil", r"\bILN-Fil\s*:\s*(\d{13})"),
+        ("liefertermin", r"\bLiefertermin\s*:\s*(.+)$"),
+        ("verkaeufer", r"\bVerk(?:ae|ä)ufer\s*:\s*(.+)$"),
+        ("lagerbestellung", r"\bLagerbestellung\s*:\s*(\S+)"),
+        ("furncloud", r"\bfurncloud:\s*\(([a-z0-9]{4} [a-z0-9]{4})\)"),
+        ("typ", r"\bTYP?\s*:\s*([^,\n]+)"),
+        ("ausf", r"\b(?:AUSF|AUF|AF)\s*:\s*([^\s,]+)"),
+    ]
+}
+
+
+def _starts_with_digit(code: str) -> bool:
+    return code[:1].isascii() and code[:1].isdigit()
+
+
+def split_article_code(code: str) -> tuple[str, str]:
+    """
+    Apply the universal ARTIKELNUMMER vs MODELLNUMMER rule to a (combined) code.
+    Returns (artikelnummer, modellnummer):
+    - plus-joined codes use only the first code ('SI9191TA-66364+ZB00-46518' -> '66364', 'SI9191TA')
+    - split once on '-' or '/', else spaced codes join all but the last part ('ZB 00 84006' -> '84006', 'ZB00')
+    - first character decides: digit -> artikelnummer, letter -> modellnummer
+    """
+    code = (code or "").split("+", 1)[0].strip()
+    if not code:
+        return "", ""
+    for sep in ("-", "/"):
+        if sep in code:
+            first, second = (part.strip() for part in code.split(sep, 1))
+            break
+    else:
+        parts = code.split()
+        first, second = ("".join(parts[:-1]), parts[-1]) if len(parts) > 1 else (code, "")
+    if not second:
+        return (first, "") if _starts_with_digit(first) else ("", first)
+    if _starts_with_digit(first):
+        return first, second
+    return second, first
+
+
+# Field names of the REQUIRED OUTPUT STRUCTURE, shared by the JSON schema below.
+OUTPUT_HEADER_FIELDS = [
+    "ticket_number",
+    "kundennummer",
+    "adressnummer",
+    "kom_nr",
+    "kom_name",
+    "liefertermin",
+    "wunschtermin",
+    "bestelldatum",
+    "lieferanschrift",
+    "tour",
+    "store_name",
+    "store_address",
+    "seller",
+    "iln_anl",
+    "iln_fil",
+    "human_review_needed",
+    "reply_needed",
+    "post_case",
+]
+OUTPUT_ITEM_FIELDS = ["artikelnummer", "modellnummer", "menge", "furncloud_id"]
+
+_FIELD_ENTRY_SCHEMA: dict = {
+    "type": "object",
+    "properties": {
+        "value": {"type": ["string", "number", "boolean"]},
+        "source": {"type": "string", "enum": ["pdf", "email", "image", "derived"]},
+        "confidence": {"type": "number"},
+    },
+    "required": ["value", "source", "confidence"],
+}
+
+# JSON schema for the order extraction response, passed to the API as structured output
+# (non-strict, so extra keys like kom_name_pdf are still allowed).
+ORDER_OUTPUT_SCHEMA: dict = {
+    "type": "object",
+    "properties": {
+        "message_id": {"type": "string"},
+        "received_at": {"type": "string"},
+        "header": {
+            "type": "object",
+            "properties": {field: _FIELD_ENTRY_SCHEMA for field in OUTPUT_HEADER_FIELDS},
+            "required": OUTPUT_HEADER_FIELDS,
+        },
+        "items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "line_no": {"type": "integer"},
+                    **{field: _FIELD_ENTRY_SCHEMA for field in OUTPUT_ITEM_FIELDS},
+                },
+                "required": ["line_no", *OUTPUT_ITEM_FIELDS],
+            },
+        },
+        "status": {"type": "string", "enum": ["ok", "partial", "failed"]},
+        "warnings": {"type": "array", "items": {"type": "string"}},
+        "errors": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["header", "items", "status", "warnings", "errors"],
+}
+
+
+def _field(value: Any, source: str, confidence: float) -> dict[str, Any]:
+    return {"value": value, "source": source, "confidence": confidence}
+
+
+# Example response shown in the prompt; rendered to JSON once at import.
+_EXAMPLE_OUTPUT: dict[str, Any] = {
+    "message_id": "string",
+    "received_at": "ISO-8601",
+    "header": {
+        "ticket_number": _field("1000001", "email", 1.0),
+        "kundennummer": _field("65348", "derived", 1.0),
+        "adressnummer": _field("9007019012285", "email", 0.95),
+        "kom_nr": _field("SRX0TS-1", "email", 0.95),
+        "kom_name": _field("RIESENHUBER", "email", 0.95),
+        "liefertermin": _field("KW08/2026, NICHT FRUEHER,NICHT SPAETER", "email", 0.95),
+        "wunschtermin": _field("", "derived", 0.0),
+        "bestelldatum": _field("02.01.26", "email", 0.9),
+        "lieferanschrift": _field("SAMESLEITEN 83\nA-4490 ST.FLORIAN", "email", 0.95),
+        "tour": _field("", "derived", 0.0),
+        "store_name": _field("XXXLutz KG Filiale Steyr", "email", 0.9),
+        "store_address": _field("Ennserstraße 33, 4400 Steyr", "email", 0.9),
+        "seller": _field("FRAU SCHNIRZER SUSANNE", "email", 0.95),
+        "iln_anl": _field("9007019012285", "email", 0.95),
+        "iln_fil": _field("9007019005744", "email", 0.95),
+        "human_review_needed": _field(False, "derived", 1.0),
+        "reply_needed": _field(False, "derived", 1.0),
+        "post_case": _field(False, "derived", 1.0),
+    },
+    "items": [
+        {
+            "line_no": 1,
+            "artikelnummer": _field("60951", "email", 0.95),
+            "modellnummer": _field("CQ9606XA", "email", 0.9),
+            "menge": _field(1, "email", 0.95),
+            "furncloud_id": _field("yif3 aqz7", "email", 0.9),
+        }
+    ],
+    "status": "ok",
+    "warnings": [],
+    "errors": [],
+}
+assert list(_EXAMPLE_OUTPUT["header"]) == OUTPUT_HEADER_FIELDS, "prompt example header drifted from schema"
+assert [k for k in _EXAMPLE_OUTPUT["items"][0] if k != "line_no"] == OUTPUT_ITEM_FIELDS, (
+    "prompt example items drifted from schema"
+)
+
+
+def _render_example_json(obj: Any, indent: int = 0) -> str:
+    """json.dumps with indent=2, except field entries ({"value": ...}) stay on one line."""
+    pad = "  " * indent
+    if isinstance(obj, dict) and obj and "value" not in obj:
+        inner = ",\n".join(
+            f"{pad}  {json.dumps(key)}: {_render_example_json(val, indent + 1)}" for key, val in obj.items()
+        )
+        return "{\n" + inner + "\n" + pad + "}"
+    if isinstance(obj, list) and obj:
+        inner = ",\n".join(f"{pad}  {_render_example_json(val, indent + 1)}" for val in obj)
+        return "[\n" + inner + "\n" + pad + "]"
+    return json.dumps(obj, ensure_ascii=False)
+
+
+_EXAMPLE_JSON = _render_example_json(_EXAMPLE_OUTPUT)
+
 ORDER_FORMAT_CLASSIFIER_SYSTEM_PROMPT = (
     "You are an order format classifier for XXLUTZ/MOEMAX order emails. "
     "Classify the order format using only the provided email metadata/content. "
     "Return JSON only."
 )
+ORDER_FORMAT_CLASSIFIER_SYSTEM_PROMPT = normalize_prompt_whitespace(ORDER_FORMAT_CLASSIFIER_SYSTEM_PROMPT)
 
 
 def build_user_instructions(source_priority: list[str]) -> str:
-    return (
+    return _build_user_instructions_cached(tuple(source_priority))
+
+
+def user_instructions_cache_info() -> Any:
+    """Hit/miss counters of the build_user_instructions cache."""
+    return _build_user_instructions_cached.cache_info()
+
+
+@lru_cache(maxsize=32)
+def _build_user_instructions_cached(source_priority: tuple[str, ...]) -> str:
+    # source_priority comes from config, so in practice every request hits the same entry.
+    return normalize_prompt_whitespace(
         "=== TASK ===\n"
         "Extract order data from XXLUTZ/MÖMAX order documents (email body, PDF attachments).\n"
-        f"SOURCE TRUST PRIORITY: {', '.join(source_priority).upper()}\n"
-        "If conflicting data exists across sources, strictly TRUST sources in this priority order.\n"
         "\n"
         "=== CRITICAL: OUTPUT FIELD NAMES ===\n"
         "You MUST use these EXACT German field names in your output:\n"
@@ -156,25 +357,13 @@ def build_user_instructions(source_priority: list[str]) -> str:
         "  '(Cikks: 05310128/03)'        → IGNORE\n"
         "  '(ArtNr: 05310179/06)'        → IGNORE\n"
         "\n"
-        "### MULTI-ORDER EMAILS:\n"
-        "Some XXLUTZ emails contain MULTIPLE commission numbers (e.g., Komm: KJNITY-1, KJNITY-2, etc.).\n"
-        "The attachment may contain items for ALL commissions.\n"
-        "HOW TO HANDLE:\n"
-        "- Use the FIRST commission number as kom_nr (e.g., 'KJNITY-1')\n"
-        "- Or combine all: 'KJNITY-1/2/3/4'\n"
-        "- Extract ALL items from ALL pages of the attachment into the items array\n"
-        "- Number items sequentially (line_no: 1, 2, 3, 4, 5...)\n"
+        "### MULTI-ORDER EMAILS (several Komm numbers, e.g. KJNITY-1, KJNITY-2):\n"
+        "- kom_nr = first Komm (e.g. 'KJNITY-1') or combined ('KJNITY-1/2/3/4'); extract ALL items from ALL pages, line_no sequential.\n"
         "- DO NOT refuse to extract! Always output all items found.\n"
         "\n"
-        "### STORE DETAILS (CRITICAL - Always extract if available):\n"
-        "- 'store_name': The furniture store/branch name\n"
-        "  - Look for: 'Filiale:', company letterhead\n"
-        "  - Examples: 'BDSK Handels GmbH & Co. KG – Filiale Essen', 'XXXLutz KG Filiale Steyr'\n"
-        "- 'store_address': The store's address (NOT delivery address)\n"
-        "  - Look for address under/near store name\n"
-        "- 'seller': The salesperson handling the order\n"
-        "  - Look for: 'Verkäufer:', 'Verkaeufer:', 'Sachbearbeiter/in:'\n"
-        "  - Often has 'HERR' or 'FRAU' prefix\n"
+        "### STORE DETAILS (always extract if available):\n"
+        "- store_name from 'Filiale:'/letterhead (e.g. 'XXXLutz KG Filiale Steyr'); store_address = store's address, NOT delivery address.\n"
+        "- seller from 'Verkäufer:'/'Verkaeufer:'/'Sachbearbeiter/in:' (often 'HERR'/'FRAU' prefix).\n"
         "\n"
         "### PDF/TIF Attachment (furnplan style, if present):\n"
         "- Article codes like 'CQ1111XP-67538' → same split rules as email\n"
@@ -214,43 +403,7 @@ def build_user_instructions(source_priority: list[str]) -> str:
         "=== REQUIRED OUTPUT STRUCTURE ===\n"
         "Your response must be valid JSON with EXACTLY this structure:\n"
         "\n"
-        "{\n"
-        '  "message_id": "string",\n'
-        '  "received_at": "ISO-8601",\n'
-        '  "header": {\n'
-        '    "ticket_number": {"value": "1000001", "source": "email", "confidence": 1.0},\n'
-        '    "kundennummer": {"value": "65348", "source": "derived", "confidence": 1.0},\n'
-        '    "adressnummer": {"value": "9007019012285", "source": "email", "confidence": 0.95},\n'
-        '    "kom_nr": {"value": "SRX0TS-1", "source": "email", "confidence": 0.95},\n'
-        '    "kom_name": {"value": "RIESENHUBER", "source": "email", "confidence": 0.95},\n'
-        '    "liefertermin": {"value": "KW08/2026, NICHT FRUEHER,NICHT SPAETER", "source": "email", "confidence": 0.95},\n'
-        '    "wunschtermin": {"value": "", "source": "derived", "confidence": 0.0},\n'
-        '    "bestelldatum": {"value": "02.01.26", "source": "email", "confidence": 0.9},\n'
-        '    "lieferanschrift": {"value": "SAMESLEITEN 83\\nA-4490 ST.FLORIAN", "source": "email", "confidence": 0.95},\n'
-        '    "tour": {"value": "", "source": "derived", "confidence": 0.0},\n'
-        '    "store_name": {"value": "XXXLutz KG Filiale Steyr", "source": "email", "confidence": 0.9},\n'
-        '    "store_address": {"value": "Ennserstraße 33, 4400 Steyr", "source": "email", "confidence": 0.9},\n'
-        '    "seller": {"value": "FRAU SCHNIRZER SUSANNE", "source": "email", "confidence": 0.95},\n'
-        '    "iln_anl": {"value": "9007019012285", "source": "email", "confidence": 0.95},\n'
-        '    "iln_fil": {"value": "9007019005744", "source": "email", "confidence": 0.95},\n'
-        '    "human_review_needed": {"value": false, "source": "derived", "confidence": 1.0},\n'
-        '    "reply_needed": {"value": false, "source": "derived", "confidence": 1.0},\n'
-        '    "post_case": {"value": false, "source": "derived", "confidence": 1.0}\n'
-        '  },\n'
-        "When PDF kom_name differs from email, add to header: \"kom_name_pdf\": \"<PDF value>\" (string or {\"value\": \"...\"}).\n"
-        '  "items": [\n'
-        '    {\n'
-        '      "line_no": 1,\n'
-        '      "artikelnummer": {"value": "60951", "source": "email", "confidence": 0.95},\n'
-        '      "modellnummer": {"value": "CQ9606XA", "source": "email", "confidence": 0.9},\n'
-        '      "menge": {"value": 1, "source": "email", "confidence": 0.95},\n'
-        '      "furncloud_id": {"value": "yif3 aqz7", "source": "email", "confidence": 0.9}\n'
-        '    }\n'
-        '  ],\n'
-        '  "status": "ok",\n'
-        '  "warnings": [],\n'
-        '  "errors": []\n'
-        '}\n'
+        f"{_EXAMPLE_JSON}\n"
         "\n"
         "=== CONFLICTS AND WARNINGS ===\n"
         "When kom_name (the short commission/person name, e.g. HABA or KREM) from the PDF is different from kom_name from the email, do BOTH: "
@@ -259,39 +412,41 @@ def build_user_instructions(source_priority: list[str]) -> str:
         "The system will then add a warning. Do NOT add to the 'warnings' array yourself.\n"
         "\n"
         "=== STATUS VALUES ===\n"
-        "- 'ok': All required fields extracted successfully\n"
-        "- 'partial': Some fields missing or uncertain\n"
-        "- 'failed': Could not extract meaningful data\n"
+        "- 'ok' = all required fields extracted; 'partial' = some missing/uncertain; 'failed' = no meaningful data.\n"
         "\n"
-        "REMEMBER: Use ONLY German field names (kundennummer, artikelnummer, etc.)\n"
+        "Use ONLY the German field names above.\n"
         "NEVER use English field names (customer_number, item_number, etc.)\n"
+        + build_source_priority_block(list(source_priority))
     )
 
 
-def build_order_format_classifier_instructions() -> str:
-    return (
-        "=== TASK ===\n"
-        "Classify the incoming order into exactly one format.\n"
-        "\n"
-        "Allowed values:\n"
-        "- standard_xxxlutz: Standard XXLUTZ-style order (often with Komm:, ILN fields, and optional PDF/TIF)\n"
-        "- momax_branch: MOEMAX/MOMAX branch Lagerbestellung format (email-driven branch stock order)\n"
-        "- unknown: not enough evidence\n"
-        "\n"
-        "Primary signals for momax_branch:\n"
-        "- 'Lagerbestellung' in body/subject\n"
-        "- branch-style line items with TY/TYP + AUSF/AF patterns\n"
-        "- store workflow wording typical for branch stock orders\n"
-        "\n"
-        "Primary signals for standard_xxxlutz:\n"
-        "- Komm/Komm. fields, ILN-Anl/ILN-Fil, classic XXLUTZ order wording\n"
-        "- optional furnplan PDF/TIF attachment references\n"
-        "\n"
-        "Respond ONLY with JSON:\n"
-        "{\n"
-        '  "format": "standard_xxxlutz|momax_branch|unknown",\n'
-        '  "confidence": 0.0,\n'
-        '  "reason": "short explanation"\n'
-        "}\n"
-    )
+ORDER_FORMAT_CLASSIFIER_INSTRUCTIONS = (
+    "=== TASK ===\n"
+    "Classify the incoming order into exactly one format.\n"
+    "\n"
+    "Allowed values:\n"
+    "- standard_xxxlutz: Standard XXLUTZ-style order (often with Komm:, ILN fields, and optional PDF/TIF)\n"
+    "- momax_branch: MOEMAX/MOMAX branch Lagerbestellung format (email-driven branch stock order)\n"
+    "- unknown: not enough evidence\n"
+    "\n"
+    "Primary signals for momax_branch:\n"
+    "- 'Lagerbestellung' in body/subject\n"
+    "- branch-style line items with TY/TYP + AUSF/AF patterns\n"
+    "- store workflow wording typical for branch stock orders\n"
+    "\n"
+    "Primary signals for standard_xxxlutz:\n"
+    "- Komm/Komm. fields, ILN-Anl/ILN-Fil, classic XXLUTZ order wording\n"
+    "- optional furnplan PDF/TIF attachment references\n"
+    "\n"
+    "Respond ONLY with JSON:\n"
+    "{\n"
+    '  "format": "standard_xxxlutz|momax_branch|unknown",\n'
+    '  "confidence": 0.0,\n'
+    '  "reason": "short explanation"\n'
+    "}\n"
+)
+ORDER_FORMAT_CLASSIFIER_INSTRUCTIONS = normalize_prompt_whitespace(ORDER_FORMAT_CLASSIFIER_INSTRUCTIONS)
 
+
+def build_order_format_classifier_instructions() -> str:
+    return ORDER_FORMAT_CLASSIFIER_INSTRUCTIONS
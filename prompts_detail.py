@@ -4,11 +4,16 @@ Extracts manufacturer info, full article IDs, descriptions, dimensions,
 hierarchical positions, and configuration remarks from PDF attachments.
 """
 
+import re
+
+from prompts_shared import normalize_prompt_whitespace
+
 DETAIL_SYSTEM_PROMPT = (
     "You are an expert at extracting detailed furniture article data from XXLUTZ furnplan PDF documents. "
     "You extract structured data about articles including full article IDs, descriptions, dimensions, "
     "and configuration details. Output ONLY valid JSON."
 )
+DETAIL_SYSTEM_PROMPT = normalize_prompt_whitespace(DETAIL_SYSTEM_PROMPT)
 
 
 # Manufacturer ILN lookup table (Staud is the primary manufacturer for XXLUTZ orders)
@@ -21,9 +26,35 @@ MANUFACTURER_ILN_MAP = {
 }
 
 
+def resolve_manufacturer_iln(manufacturer_name: str) -> str:
+    """
+    Map a manufacturer name to its ILN by matching a known name against its words
+    ('Rauch Möbelwerke GmbH' -> Rauch). An empty name defaults to Staud for XXLUTZ orders;
+    any other unknown manufacturer returns "" so the exporter fallback and review handle it.
+    """
+    words = re.findall(r"\w+", (manufacturer_name or "").lower())
+    if not words:
+        return MANUFACTURER_ILN_MAP["staud"]
+    return next((iln for name, iln in MANUFACTURER_ILN_MAP.items() if name in words), "")
+
+
+def derive_prog_id(program_name: str) -> str:
+    """
+    Derive prog_id from the program name.
+    Two or more words: first 3 letters of the first word + first letter of the second ('System One' -> 'SYSO').
+    Single word: first 4 letters ('Includo' -> 'INCL').
+    """
+    parts = (program_name or "").split()
+    if not parts:
+        return ""
+    if len(parts) >= 2:
+        return (parts[0][:3] + parts[1][:1]).upper()
+    return parts[0][:4].upper()
+
+
 def build_detail_user_instructions() -> str:
     """Build user instructions for XXLUTZ furnplan detail extraction."""
-    return (
+    return normalize_prompt_whitespace(
         "=== TASK ===\n"
         "Extract DETAILED article information from the XXLUTZ furnplan PDF images.\n"
         "These are typically furniture order specifications for wardrobes, beds, and accessories.\n"
@@ -81,28 +112,6 @@ def build_detail_user_instructions() -> str:
         "- Schubkasteneinsatz (drawer insert)\n"
         "- Tür-Öffnungs- und Schließdämpfer (door dampers)\n"
         "\n"
-        "=== MANUFACTURER ILN LOOKUP ===\n"
-        "Use these ILN codes based on manufacturer name:\n"
-        "- Staud → 4039262000004 (primary for XXLUTZ)\n"
-        "- Rauch → 4003769000008\n"
-        "- Nolte → 4022956000006\n"
-        "- Wimex → 4011808000003\n"
-        "- Express → 4013227000009\n"
-        "If manufacturer not found, default to Staud ILN for XXLUTZ orders.\n"
-        "\n"
-        "=== PROGRAM ID DERIVATION ===\n"
-        "Derive prog_id from program name:\n"
-        "\n"
-        "FOR TWO-WORD NAMES: First 3 letters of first word + First letter of second word\n"
-        "- 'System One' → 'SYS' + 'O' = 'SYSO'\n"
-        "- 'Sinfonie Plus' → 'SIN' + 'P' = 'SINP'\n"
-        "\n"
-        "FOR SINGLE-WORD NAMES: First 4 letters\n"
-        "- 'Includo' → 'INCL'\n"
-        "- 'Sigma' → 'SIGM'\n"
-        "\n"
-        "Always uppercase.\n"
-        "\n"
         "=== IMPORTANT RULES ===\n"
         "1. Extract ALL articles from ALL pages - don't stop after first page!\n"
         "2. Keep article_id COMPLETE - don't split on hyphen for this output\n"
@@ -117,8 +126,6 @@ def build_detail_user_instructions() -> str:
         "{\n"
         '  "program": {\n'
         '    "manufacturer_name": "Staud",\n'
-        '    "manufacturer_iln": "4039262000004",\n'
-        '    "prog_id": "SYSO",\n'
         '    "program_name": "System One",\n'
         '    "furncloud_id": "yif3 aqz7"\n'
         '  },\n'
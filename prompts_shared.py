@@ -2,7 +2,44 @@
 Shared prompt fragments used by multiple order-format prompt files.
 """
 
+from functools import lru_cache
 
+
+def normalize_prompt_whitespace(text: str) -> str:
+    """
+    Canonical prompt whitespace: LF line endings, no trailing spaces, exactly one final newline.
+    Provider prompt caches match on the exact token prefix, so stray whitespace from editors
+    or CRLF checkouts would otherwise cause silent cache misses.
+    """
+    lines = text.replace("\r\n", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).rstrip() + "\n"
+
+
+def build_source_priority_block(source_priority: list[str]) -> str:
+    """
+    Per-request part of the instructions. Builders append it AFTER all static text so the
+    static prefix stays byte-identical across calls and hits provider prompt caches.
+    """
+    return (
+        "\n"
+        "=== DYNAMIC CONTEXT ===\n"
+        f"SOURCE TRUST PRIORITY: {', '.join(source_priority).upper()}\n"
+        "If conflicting data exists across sources, strictly TRUST sources in this priority order.\n"
+    )
+
+
+# One line per field in the JSON skeleton below; the chat-completions fallback is not
+# schema-constrained, so the prompt has to show the complete shape.
+_TEXT_FIELD = '{"value": "", "source": "pdf|email|image|derived", "confidence": 0.0}'
+_FLAG_FIELD = '{"value": false, "source": "derived", "confidence": 1.0}'
+_TEXT_HEADER_FIELDS = (
+    "kundennummer", "adressnummer", "kom_nr", "kom_name", "liefertermin", "wunschtermin", "bestelldatum",
+    "lieferanschrift", "tour", "store_name", "store_address", "seller", "iln_anl", "iln_fil",
+)
+_FLAG_HEADER_FIELDS = ("human_review_needed", "reply_needed", "post_case")
+
+
+@lru_cache(maxsize=1)
 def build_shared_output_contract() -> str:
     return (
         "=== REQUIRED OUTPUT FIELD NAMES ===\n"
@@ -39,33 +76,19 @@ def build_shared_output_contract() -> str:
         '  "received_at": "ISO-8601",\n'
         '  "header": {\n'
         '    "ticket_number": {"value": "", "source": "email|derived", "confidence": 0.0},\n'
-        '    "kundennummer": {"value": "", "source": "pdf|email|image|derived", "confidence": 0.0},\n'
-        '    "adressnummer": {"value": "", "source": "pdf|email|image|derived", "confidence": 0.0},\n'
-        '    "kom_nr": {"value": "", "source": "pdf|email|image|derived", "confidence": 0.0},\n'
-        '    "kom_name": {"value": "", "source": "pdf|email|image|derived", "confidence": 0.0},\n'
-        '    "liefertermin": {"value": "", "source": "pdf|email|image|derived", "confidence": 0.0},\n'
-        '    "wunschtermin": {"value": "", "source": "pdf|email|image|derived", "confidence": 0.0},\n'
-        '    "bestelldatum": {"value": "", "source": "pdf|email|image|derived", "confidence": 0.0},\n'
-        '    "lieferanschrift": {"value": "", "source": "pdf|email|image|derived", "confidence": 0.0},\n'
-        '    "tour": {"value": "", "source": "pdf|email|image|derived", "confidence": 0.0},\n'
-        '    "store_name": {"value": "", "source": "pdf|email|image|derived", "confidence": 0.0},\n'
-        '    "store_address": {"value": "", "source": "pdf|email|image|derived", "confidence": 0.0},\n'
-        '    "seller": {"value": "", "source": "pdf|email|image|derived", "confidence": 0.0},\n'
-        '    "iln_anl": {"value": "", "source": "pdf|email|image|derived", "confidence": 0.0},\n'
-        '    "iln_fil": {"value": "", "source": "pdf|email|image|derived", "confidence": 0.0},\n'
-        '    "human_review_needed": {"value": false, "source": "derived", "confidence": 1.0},\n'
-        '    "reply_needed": {"value": false, "source": "derived", "confidence": 1.0},\n'
-        '    "post_case": {"value": false, "source": "derived", "confidence": 1.0}\n'
-        '  },\n'
+        + "".join(f'    "{name}": {_TEXT_FIELD},\n' for name in _TEXT_HEADER_FIELDS)
+        + ",\n".join(f'    "{name}": {_FLAG_FIELD}' for name in _FLAG_HEADER_FIELDS)
+        + "\n"
+        "  },\n"
         '  "items": [\n'
-        '    {\n'
+        "    {\n"
         '      "line_no": 1,\n'
-        '      "artikelnummer": {"value": "", "source": "pdf|email|image|derived", "confidence": 0.0},\n'
-        '      "modellnummer": {"value": "", "source": "pdf|email|image|derived", "confidence": 0.0},\n'
+        f'      "artikelnummer": {_TEXT_FIELD},\n'
+        f'      "modellnummer": {_TEXT_FIELD},\n'
         '      "menge": {"value": 1, "source": "pdf|email|image|derived", "confidence": 0.0},\n'
-        '      "furncloud_id": {"value": "", "source": "pdf|email|image|derived", "confidence": 0.0}\n'
-        '    }\n'
-        '  ],\n'
+        f'      "furncloud_id": {_TEXT_FIELD}\n'
+        "    }\n"
+        "  ],\n"
         '  "status": "ok|partial|failed",\n'
         '  "warnings": [],\n'
         '  "errors": []\n'
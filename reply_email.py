@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 from email.message import EmailMessage
+from functools import lru_cache
 import smtplib
+import time
 from typing import Any
 
 from config import Config
@@ -11,65 +13,165 @@ from email_ingest import IngestedEmail
 _REPLY_WARNING_PREFIX = "Reply needed:"
 _MISSING_CRITICAL_REPLY_PREFIX = "Missing critical header fields:"
 _MISSING_CRITICAL_ITEM_REPLY_PREFIX = "Missing critical item fields:"
+# (canonical prefix, lowercased prefix) pairs for case-insensitive matching
+_MISSING_CRITICAL_PREFIXES = tuple(
+    (prefix, prefix.lower())
+    for prefix in (_MISSING_CRITICAL_REPLY_PREFIX, _MISSING_CRITICAL_ITEM_REPLY_PREFIX)
+)
 
 
-def _header_value(header: dict[str, Any], key: str) -> str:
-    entry = header.get(key, {})
-    if isinstance(entry, dict):
-        return str(entry.get("value", "") or "").strip()
-    return str(entry or "").strip()
+_REPLY_HEADER_KEYS = (
+    "ticket_number",
+    "kundennummer",
+    "kom_nr",
+    "kom_name",
+    "liefertermin",
+    "wunschtermin",
+    "iln",
+)
 
 
-def _reply_cases_from_warnings(warnings: list[Any]) -> list[str]:
-    if not isinstance(warnings, list):
-        return []
-    cases: list[str] = []
-    seen: set[str] = set()
-    for warning in warnings:
-        if isinstance(warning, str) and warning.startswith(_REPLY_WARNING_PREFIX):
-            case = warning[len(_REPLY_WARNING_PREFIX) :].strip()
-            if not case:
-                continue
-            key = case.lower()
-            if key in seen:
-                continue
-            seen.add(key)
-            cases.append(case)
-    return cases
-
-
-def _parse_missing_critical_case(reply_case: str) -> str:
-    if not isinstance(reply_case, str):
-        return ""
-    stripped = reply_case.strip()
-    if stripped[: len(_MISSING_CRITICAL_REPLY_PREFIX)].lower() == _MISSING_CRITICAL_REPLY_PREFIX.lower():
-        tail = stripped[len(_MISSING_CRITICAL_REPLY_PREFIX) :].strip()
-        return f"{_MISSING_CRITICAL_REPLY_PREFIX} {tail}".strip()
-    if stripped[: len(_MISSING_CRITICAL_ITEM_REPLY_PREFIX)].lower() == _MISSING_CRITICAL_ITEM_REPLY_PREFIX.lower():
-        tail = stripped[len(_MISSING_CRITICAL_ITEM_REPLY_PREFIX) :].strip()
-        return f"{_MISSING_CRITICAL_ITEM_REPLY_PREFIX} {tail}".strip()
-    return ""
-
-
-def _classify_reply_cases(reply_cases: list[str]) -> tuple[list[str], list[str]]:
+_RESEND_REQUEST = "Please resend the order with these fields filled in, or send a corrected order via furnplan.\n"
+
+_TPL_BOTH = (
+    "What happened\n"
+    "Detected two reply-needed conditions:\n"
+    "1) Substitution request (STATT ... BITTE ...).\n"
+    "2) Missing mandatory header fields for automatic processing.\n"
+    "\n"
+    "Substitution details\n"
+    "{substitution_block}"
+    "\n"
+    "Missing mandatory fields\n"
+    "{missing_block}"
+    + _RESEND_REQUEST
+)
+
+_TPL_MISSING = (
+    "What happened\n"
+    "Automatic order processing could not continue because mandatory fields are missing.\n"
+    "\n"
+    "Missing mandatory fields\n"
+    "{missing_block}"
+    + _RESEND_REQUEST
+)
+
+_TPL_SUBS = (
+    "What happened\n"
+    "Detected a substitution request (STATT ... BITTE ...).\n"
+    "{subs_block}"
+)
+
+_TPL_CONTEXT = (
+    "\n"
+    "Context\n"
+    "Message-ID: {message_id}\n"
+    "Received-At: {received_at}\n"
+    "From: {sender}\n"
+    "Subject: {subject}\n"
+    "\n"
+    "Extracted fields\n"
+    "ticket_number: {ticket_number}\n"
+    "kundennummer: {kundennummer}\n"
+    "kom_nr: {kom_nr}\n"
+    "kom_name: {kom_name}\n"
+    "liefertermin: {liefertermin}\n"
+    "wunschtermin: {wunschtermin}\n"
+    "iln: {iln}\n"
+)
+
+# Keyed by (has_substitution, has_missing_critical); compose rejects the (False, False) case earlier.
+_SUBJECT_LABELS = {
+    (True, True): "multiple issues",
+    (False, True): "missing critical fields",
+    (True, False): "swap detected",
+}
+
+
+def _numbered_block(cases: list[str]) -> str:
+    return "".join(f"{idx}. {case}\n" for idx, case in enumerate(cases, start=1))
+
+
+def _bulk_header_values(header: dict[str, Any], keys: tuple[str, ...]) -> dict[str, str]:
+    values: dict[str, str] = {}
+    for key in keys:
+        entry = header.get(key)
+        # Fast path: entries follow the {"value": ...} contract; bare values are the exception.
+        try:
+            value = entry["value"]
+        except KeyError:
+            value = ""
+        except TypeError:
+            value = entry
+        values[key] = str(value).strip() if value else ""
+    return values
+
+
+def _extract_reply_cases(warnings: list[Any] | tuple[Any, ...]) -> tuple[list[str], list[str]]:
+    """Split 'Reply needed:' warnings into (substitution cases, missing-critical cases).
+
+    Single pass: each case is lowercased once and that key drives both the
+    overall dedupe and the missing-critical prefix match.
+    """
     substitution_cases: list[str] = []
     missing_cases: list[str] = []
+    if not isinstance(warnings, (list, tuple)):
+        return substitution_cases, missing_cases
+    seen: set[str] = set()
     seen_missing: set[str] = set()
 
-    for case in reply_cases:
-        parsed_missing = _parse_missing_critical_case(case)
-        if parsed_missing:
-            key = parsed_missing.lower()
-            if key in seen_missing:
-                continue
-            seen_missing.add(key)
-            missing_cases.append(parsed_missing)
+    for warning in warnings:
+        if not (isinstance(warning, str) and warning.startswith(_REPLY_WARNING_PREFIX)):
+            continue
+        case = warning[len(_REPLY_WARNING_PREFIX) :].strip()
+        if not case:
+            continue
+        key = case.lower()
+        if key in seen:
             continue
-        substitution_cases.append(case)
+        seen.add(key)
+
+        for prefix, prefix_lower in _MISSING_CRITICAL_PREFIXES:
+            if key.startswith(prefix_lower):
+                tail = case[len(prefix) :].strip()
+                missing_key = f"{prefix_lower} {key[len(prefix) :].strip()}".strip()
+                if missing_key not in seen_missing:
+                    seen_missing.add(missing_key)
+                    missing_cases.append(f"{prefix} {tail}".strip())
+                break
+        else:
+            substitution_cases.append(case)
 
     return substitution_cases, missing_cases
 
 
+@lru_cache(maxsize=512)
+def _reply_summary(warnings: tuple[str, ...]) -> tuple[str, str, bool]:
+    """Return (subject label, "What happened" block, has missing-critical cases) for a warning set.
+
+    Depends only on the warnings, so it is cached: the same canonical warnings
+    recur across many orders.
+    """
+    substitution_cases, missing_critical_fields = _extract_reply_cases(warnings)
+    if not (substitution_cases or missing_critical_fields):
+        raise ValueError("No 'Reply needed:' warnings to compose a reply email from")
+    has_substitution = bool(substitution_cases)
+    has_missing_critical = bool(missing_critical_fields)
+
+    if has_substitution and has_missing_critical:
+        what_happened = _TPL_BOTH.format(
+            substitution_block=_numbered_block(substitution_cases),
+            missing_block=_numbered_block(missing_critical_fields),
+        )
+    elif has_missing_critical:
+        what_happened = _TPL_MISSING.format(missing_block=_numbered_block(missing_critical_fields))
+    else:
+        what_happened = _TPL_SUBS.format(
+            subs_block="".join(f"Reply case: {case}\n" for case in substitution_cases)
+        )
+    return _SUBJECT_LABELS[(has_substitution, has_missing_critical)], what_happened, has_missing_critical
+
+
 def compose_reply_needed_email(
     message: IngestedEmail,
     normalized: dict[str, Any],
@@ -81,106 +183,120 @@ def compose_reply_needed_email(
     header = normalized.get("header") if isinstance(normalized.get("header"), dict) else {}
     warnings = normalized.get("warnings") if isinstance(normalized.get("warnings"), list) else []
 
-    ticket_number = _header_value(header, "ticket_number")
-    kom_nr = _header_value(header, "kom_nr")
+    fields = _bulk_header_values(header, _REPLY_HEADER_KEYS)
+    ticket_number = fields["ticket_number"]
+    kom_nr = fields["kom_nr"]
     message_id = message.message_id or normalized.get("message_id") or ""
     subject_hint = ticket_number or kom_nr or message_id or "unknown"
 
-    reply_cases = _reply_cases_from_warnings(warnings)
-    substitution_cases, missing_critical_fields = _classify_reply_cases(reply_cases)
-    has_substitution = bool(substitution_cases)
-    has_missing_critical = bool(missing_critical_fields)
+    subject_label, what_happened, has_missing_critical = _reply_summary(
+        tuple(warning for warning in warnings if isinstance(warning, str))
+    )
 
-    body_lines: list[str] = []
+    preamble = ""
     if not has_missing_critical:
         template_text = (body_template or "").strip()
         if template_text:
-            body_lines.append(template_text)
-            body_lines.append("")
-    body_lines.append("What happened")
-    if has_substitution and has_missing_critical:
-        body_lines.append("Detected two reply-needed conditions:")
-        body_lines.append("1) Substitution request (STATT ... BITTE ...).")
-        body_lines.append("2) Missing mandatory header fields for automatic processing.")
-        body_lines.append("")
-        body_lines.append("Substitution details")
-        for idx, case in enumerate(substitution_cases, start=1):
-            body_lines.append(f"{idx}. {case}")
-        body_lines.append("")
-        body_lines.append("Missing mandatory fields")
-        for idx, case in enumerate(missing_critical_fields, start=1):
-            body_lines.append(f"{idx}. {case}")
-        body_lines.append(
-            "Please resend the order with these fields filled in, or send a corrected order via furnplan."
-        )
-    elif has_missing_critical:
-        body_lines.append("Automatic order processing could not continue because mandatory fields are missing.")
-        body_lines.append("")
-        body_lines.append("Missing mandatory fields")
-        for idx, case in enumerate(missing_critical_fields, start=1):
-            body_lines.append(f"{idx}. {case}")
-        body_lines.append(
-            "Please resend the order with these fields filled in, or send a corrected order via furnplan."
-        )
-    else:
-        body_lines.append("Detected a substitution request (STATT ... BITTE ...).")
-        for case in substitution_cases:
-            body_lines.append(f"Reply case: {case}")
-    body_lines.append("")
-    body_lines.append("Context")
-    body_lines.append(f"Message-ID: {message_id}")
-    body_lines.append(f"Received-At: {message.received_at or normalized.get('received_at') or ''}")
-    body_lines.append(f"From: {message.sender or ''}")
-    body_lines.append(f"Subject: {message.subject or ''}")
-    body_lines.append("")
-    body_lines.append("Extracted fields")
-    body_lines.append(f"ticket_number: {ticket_number}")
-    body_lines.append(f"kundennummer: {_header_value(header, 'kundennummer')}")
-    body_lines.append(f"kom_nr: {kom_nr}")
-    body_lines.append(f"kom_name: {_header_value(header, 'kom_name')}")
-    body_lines.append(f"liefertermin: {_header_value(header, 'liefertermin')}")
-    body_lines.append(f"wunschtermin: {_header_value(header, 'wunschtermin')}")
-    body_lines.append(f"iln: {_header_value(header, 'iln')}")
+            preamble = f"{template_text}\n\n"
+
+    body = preamble + what_happened + _TPL_CONTEXT.format(
+        message_id=message_id,
+        received_at=message.received_at or normalized.get("received_at") or "",
+        sender=message.sender or "",
+        subject=message.subject or "",
+        **fields,
+    )
 
     msg = EmailMessage()
     msg["To"] = to_addr
-    if has_substitution and has_missing_critical:
-        msg["Subject"] = f"Reply needed - multiple issues - {subject_hint}"
-    elif has_missing_critical:
-        msg["Subject"] = f"Reply needed - missing critical fields - {subject_hint}"
-    else:
-        msg["Subject"] = f"Reply needed - swap detected - {subject_hint}"
-    msg.set_content("\n".join(body_lines).rstrip() + "\n")
+    msg["Subject"] = f"Reply needed - {subject_label} - {subject_hint}"
+    msg.set_content(body.rstrip() + "\n")
     return msg
 
 
-def send_email_via_smtp(config: Config, email_message: EmailMessage) -> None:
-    if not config.smtp_host:
-        raise ValueError("SMTP_HOST is missing")
-    if not config.smtp_user:
-        raise ValueError("SMTP_USER is missing")
-    if not config.smtp_password:
-        raise ValueError("SMTP_PASSWORD is missing")
+class SMTPSession:
+    """Reusable SMTP connection for sending several reply emails.
 
-    if "From" in email_message:
-        email_message.replace_header("From", config.smtp_user)
-    else:
-        email_message["From"] = config.smtp_user
+    Connects lazily on the first send, keeps the authenticated connection open
+    for later sends and reconnects (with backoff) if the server drops it.
+    """
+
+    def __init__(self, config: Config, max_retries: int = 2, retry_delay: float = 1.0) -> None:
+        self.config = config
+        self.max_retries = max(0, max_retries)
+        self.retry_delay = retry_delay
+        self._server: smtplib.SMTP | None = None
+
+    def __enter__(self) -> "SMTPSession":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
 
-    host = config.smtp_host
-    port = int(config.smtp_port or 0) or 587
+    def _connect(self) -> smtplib.SMTP:
+        config = self.config
+        host = config.smtp_host
+        port = int(config.smtp_port or 0) or 587
 
-    if config.smtp_ssl and port == 465:
-        with smtplib.SMTP_SSL(host, port) as server:
+        if config.smtp_ssl and port == 465:
+            server: smtplib.SMTP = smtplib.SMTP_SSL(host, port)
             server.ehlo()
+        else:
+            server = smtplib.SMTP(host, port)
+            server.ehlo()
+            if config.smtp_ssl:
+                server.starttls()
+                server.ehlo()
+        try:
             server.login(config.smtp_user, config.smtp_password)
-            server.send_message(email_message)
-        return
+        except Exception:
+            server.close()
+            raise
+        return server
 
-    with smtplib.SMTP(host, port) as server:
-        server.ehlo()
-        if config.smtp_ssl:
-            server.starttls()
-            server.ehlo()
-        server.login(config.smtp_user, config.smtp_password)
-        server.send_message(email_message)
+    def send(self, email_message: EmailMessage) -> None:
+        config = self.config
+        if not config.smtp_host:
+            raise ValueError("SMTP_HOST is missing")
+        if not config.smtp_user:
+            raise ValueError("SMTP_USER is missing")
+        if not config.smtp_password:
+            raise ValueError("SMTP_PASSWORD is missing")
+
+        if "From" in email_message:
+            email_message.replace_header("From", config.smtp_user)
+        else:
+            email_message["From"] = config.smtp_user
+
+        delay = self.retry_delay
+        for attempt in range(self.max_retries + 1):
+            if self._server is None:
+                self._server = self._connect()
+            try:
+                self._server.send_message(email_message)
+                return
+            except smtplib.SMTPServerDisconnected:
+                self._server = None
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(delay)
+                delay *= 2
+
+    def close(self) -> None:
+        server, self._server = self._server, None
+        if server is None:
+            return
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+
+def send_email_via_smtp(
+    config: Config, email_message: EmailMessage, session: SMTPSession | None = None
+) -> None:
+    if session is not None:
+        session.send(email_message)
+        return
+    with SMTPSession(config) as one_shot:
+        one_shot.send(email_message)
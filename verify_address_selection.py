@@ -1,23 +1,63 @@
 import argparse
+import re
 
+import numpy as np
 import pandas as pd
 
 import lookup
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None  # Falls back to per-row substring checks
+
+
+# Mojibake rewrites, applied in one scan (the keys are disjoint and the replacements are ASCII).
+_MOJIBAKE_MAP = {
+    "Ã¤": "ae",
+    "Ã¶": "oe",
+    "Ã¼": "ue",
+    "ÃŸ": "ss",
+}
+_MOJIBAKE_RE = re.compile("|".join(re.escape(k) for k in _MOJIBAKE_MAP))
+# Street suffixes stay chained replaces: each pass sees the previous one's output
+# ("hauptstrasse." -> "hauptstr." -> "hauptstr"), which a single scan would not.
+_STREET_SUFFIXES = ("straÃŸe", "strasse", "strase", "strabe", "str.")
+_STRIP_CHARS = str.maketrans("", "", " -")
+
+# PLZ extraction, mirrors lookup.find_customer_by_address
+_PLZ_PREFIXED_RE = re.compile(r"[A-Z]-\s*(\d{4,5})\b", re.IGNORECASE)
+_PLZ_ANY_RE = re.compile(r"\b(\d{4,5})\b")
+
 
 def _normalize(s: str) -> str:
     if not isinstance(s, str):
         return ""
-    s = s.strip().lower()
-    s = s.replace("Ã¤", "ae").replace("Ã¶", "oe").replace("Ã¼", "ue").replace("ÃŸ", "ss")
-    s = (
-        s.replace("straÃŸe", "str")
-        .replace("strasse", "str")
-        .replace("strase", "str")
-        .replace("strabe", "str")
-        .replace("str.", "str")
-    )
-    return s.replace(" ", "").replace("-", "")
+    s = _MOJIBAKE_RE.sub(lambda m: _MOJIBAKE_MAP[m.group(0)], s.strip().lower())
+    for suffix in _STREET_SUFFIXES:
+        s = s.replace(suffix, "str")
+    return s.translate(_STRIP_CHARS)
+
+
+def _substring_hits(needles: pd.Series, haystack: str) -> np.ndarray:
+    """Boolean mask: which needles occur in haystack (one Aho-Corasick scan when available)."""
+    if ahocorasick is None:
+        return np.fromiter((n in haystack for n in needles), dtype=bool, count=len(needles))
+    hits = np.zeros(len(needles), dtype=bool)
+    positions: dict[str, list[int]] = {}
+    for idx, needle in enumerate(needles):
+        if needle:
+            positions.setdefault(needle, []).append(idx)
+        else:
+            hits[idx] = True
+    if positions:
+        automaton = ahocorasick.Automaton()
+        for needle in positions:
+            automaton.add_word(needle, needle)
+        automaton.make_automaton()
+        for _, needle in automaton.iter(haystack):
+            hits[positions[needle]] = True
+    return hits
 
 
 def main() -> int:
@@ -37,17 +77,16 @@ def main() -> int:
     addr_clean = _normalize(address_str)
 
     # Extract PLZ similarly to lookup.find_customer_by_address
-    import re
-
     plz = None
-    plz_match = re.search(r"[A-Z]-\s*(\d{4,5})\b", address_str, re.IGNORECASE)
+    plz_match = _PLZ_PREFIXED_RE.search(address_str)
     if plz_match:
         plz = plz_match.group(1)
     else:
-        all_matches = re.findall(r"\b(\d{4,5})\b", address_str)
+        all_matches = _PLZ_ANY_RE.findall(address_str)
         if all_matches:
             plz = max(all_matches, key=lambda x: (len(x) == 5, len(x)))
 
+    # Same string comparison as lookup.find_customer_by_address, so "00" or "0.00" are not main addresses here either
     subset = df[df["Adressnummer"].astype(str).str.replace(".0", "", regex=False).str.strip() == "0"]
     subset = lookup._filter_by_verband(subset)
     if subset is None:
@@ -55,18 +94,25 @@ def main() -> int:
         return 2
 
     if plz:
-        subset = subset[subset["Postleitzahl"].astype(str).str.replace(".0", "", regex=False).str.strip() == plz]
-
-    candidates = []
-    for _, row in subset.iterrows():
-        strasse_db = str(row.get("Strasse", ""))
-        ort_db = str(row.get("Ort", ""))
-        if len(strasse_db) < 3 or len(ort_db) < 3:
-            continue
-        if _normalize(strasse_db) in addr_clean and _normalize(ort_db) in addr_clean:
-            candidates.append(row)
-
-    cand_df = pd.DataFrame(candidates) if candidates else pd.DataFrame()
+        # load_data already stores Postleitzahl as a cleaned string
+        subset = subset[subset["Postleitzahl"] == plz]
+
+    def _column(name: str) -> pd.Series:
+        if name not in subset.columns:
+            return pd.Series("", index=subset.index)
+        return subset[name].fillna("").astype(str)
+
+    strasse_db = _column("Strasse")
+    ort_db = _column("Ort")
+    strasse_norm = strasse_db.map(_normalize)
+    ort_norm = ort_db.map(_normalize)
+    mask = (
+        (strasse_db.str.len() >= 3)
+        & (ort_db.str.len() >= 3)
+        & _substring_hits(strasse_norm, addr_clean)
+        & _substring_hits(ort_norm, addr_clean)
+    )
+    cand_df = subset.loc[mask]
 
     cols = [c for c in ["Kundennummer", "Kundenbetrieb", "Name1", "Name2", "Strasse", "Ort", "Postleitzahl", "Adressnummer", "Tour", "Verband"] if c in cand_df.columns]
     print(f"PLZ extracted: {plz!r}")
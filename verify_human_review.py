@@ -5,29 +5,30 @@ from pipeline import process_message, ProcessedResult
 from normalize import normalize_output
 from config import Config
 from email_ingest import IngestedEmail
+from main import write_json_output
+
+# Mock LLM Response with human_review_needed = True (serialized once per module)
+MOCK_RESPONSE_JSON = json.dumps({
+    "header": {
+        "kundennummer": {"value": "12345", "source": "pdf", "confidence": 0.9},
+        "human_review_needed": {"value": True, "source": "pdf", "confidence": 1.0}
+    },
+    "items": [],
+    "warnings": [],
+    "errors": []
+})
+
+# Mock configuration, shared by every test in this module
+CONFIG = Config.from_env()
+CONFIG.output_dir = Path("./test_output_human_loop")
+CONFIG.output_dir.mkdir(exist_ok=True)
 
 def test_human_review_preservation():
-    # Mock configuration
-    config = Config.from_env()
-    config.output_dir = Path("./test_output_human_loop")
-    config.output_dir.mkdir(exist_ok=True)
+    config = CONFIG
 
     # Mock Extractor
     extractor = MagicMock()
-    
-    # Mock LLM Response with human_review_needed = True
-    mock_response = {
-        "header": {
-            "kundennummer": {"value": "12345", "source": "pdf", "confidence": 0.9},
-            "human_review_needed": {"value": True, "source": "pdf", "confidence": 1.0}
-        },
-        "items": [],
-        "warnings": [],
-        "errors": []
-    }
-    
-    # Mock extraction method
-    extractor.extract.return_value = json.dumps(mock_response)
+    extractor.extract.return_value = MOCK_RESPONSE_JSON
 
     # Create dummy message
     message = IngestedEmail(
@@ -54,8 +55,7 @@ def test_human_review_preservation():
 
     # Write to disk effectively simulating the app
     output_path = config.output_dir / "test_human_review.json"
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(result.data, f, indent=2)
+    write_json_output(output_path, result.data)
 
     print(f"Written to {output_path}")
 
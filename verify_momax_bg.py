@@ -1,8 +1,9 @@
 import json
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from unittest.mock import MagicMock
-
-import fitz  # PyMuPDF
+from typing import Any, Iterator
 
 import lookup
 import momax_bg
@@ -13,33 +14,199 @@ from normalize import normalize_output
 from openai_extract import ImageInput
 
 
+def _pdf_literal(line: str) -> str:
+    # Base-14 Helvetica with WinAnsiEncoding: anything outside latin-1 renders as '?'
+    raw = line.encode("latin-1", errors="replace").decode("latin-1")
+    return "(" + raw.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+@lru_cache(maxsize=64)
+def _pdf_for(text: str) -> bytes:
+    """Single-page PDF with `text` as a Helvetica text block.
+
+    Written by hand instead of through fitz: the fixtures only need page text that
+    momax_bg can read back with PyMuPDF, so MuPDF is not needed to produce them.
+    """
+    ops = " Tj T* ".join(_pdf_literal(line) for line in text.splitlines() or [""])
+    stream = f"BT /F1 11 Tf 13 TL 72 770 Td {ops} Tj ET".encode("latin-1")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+        b"/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (num, body)
+    xref_at = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_at)
+    return bytes(out)
+
+
 def _make_pdf_bytes(text: str) -> bytes:
-    doc = fitz.open()
-    page = doc.new_page()
-    page.insert_text((72, 72), text)
-    data = doc.tobytes()
-    doc.close()
-    return data
+    return _pdf_for(text)
 
 
-def test_momax_bg_two_pdf_special_case() -> None:
-    pdf_a = _make_pdf_bytes(
-        "Recipient: MOMAX BULGARIA\n"
-        "IDENT No: 20197304\n"
-        "ORDER\n"
-        "No 1711/12.12.25\n"
-        "Term for delivery: 20.03.26\n"
-        "Store: VARNA\n"
-        "Address: Varna, Blvd. Vladislav Varnenchik 277A\n"
-    )
-    pdf_b = _make_pdf_bytes(
-        "MOMAX - ORDER\n"
-        "VARNA - 88801711/12.12.25г.\n"
-        "Code/Type Quantity\n"
-        "SN/SN/71/SP/91/181 1\n"
-        "ZB99/76403 1\n"
+_STUB_IMAGES = [ImageInput(name="dummy_pdf_page.png", source="pdf", data_url="data:image/png;base64,")]
+
+
+class _FakeExtractor:
+    """Minimal stand-in for OpenAIExtractor: canned results (or exceptions to raise) per method, plus call counts."""
+
+    def __init__(
+        self,
+        *,
+        extract: Any = None,
+        extract_article_details: Any = None,
+        create_response: Any = None,
+    ) -> None:
+        self._results = {
+            "extract": extract,
+            "extract_article_details": extract_article_details,
+            "_create_response": create_response,
+        }
+        self.calls: Counter[str] = Counter()
+
+    def _result(self, name: str) -> Any:
+        self.calls[name] += 1
+        result = self._results.get(name)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def extract(self, *args: Any, **kwargs: Any) -> Any:
+        return self._result("extract")
+
+    def extract_article_details(self, *args: Any, **kwargs: Any) -> Any:
+        return self._result("extract_article_details")
+
+    def _create_response(self, *args: Any, **kwargs: Any) -> Any:
+        return self._result("_create_response")
+
+    def classify_order_format(self, *args: Any, **kwargs: Any) -> Any:
+        self.calls["classify_order_format"] += 1
+        return None
+
+    def complete_text(self, *args: Any, **kwargs: Any) -> str:
+        self.calls["complete_text"] += 1
+        return ""
+
+
+@contextmanager
+def _stub_prepare_images() -> Iterator[None]:
+    """Make pipeline._prepare_images return one dummy PDF page, restoring the original on exit."""
+    original_prepare_images = pipeline._prepare_images
+    pipeline._prepare_images = lambda attachments, config, warnings: list(_STUB_IMAGES)
+    try:
+        yield
+    finally:
+        pipeline._prepare_images = original_prepare_images
+
+
+# Shared by every test; the BG pipeline only reads the config.
+_CONFIG = Config.from_env()
+_CONFIG.output_dir = Path("./tmp_momax_bg_verify")
+_CONFIG.output_dir.mkdir(exist_ok=True)
+
+# Fixture PDFs, rendered once per run and shared across tests (bytes are immutable).
+_PDF_A_VARNA = _make_pdf_bytes(
+    "Recipient: MOMAX BULGARIA\n"
+    "IDENT No: 20197304\n"
+    "ORDER\n"
+    "No 1711/12.12.25\n"
+    "Term for delivery: 20.03.26\n"
+    "Store: VARNA\n"
+    "Address: Varna, Blvd. Vladislav Varnenchik 277A\n"
+)
+_PDF_B_VARNA = _make_pdf_bytes(
+    "MOMAX - ORDER\n"
+    "VARNA - 88801711/12.12.25г.\n"
+    "Code/Type Quantity\n"
+    "SN/SN/71/SP/91/181 1\n"
+    "ZB99/76403 1\n"
+)
+_PDF_NON_BG = _make_pdf_bytes("Some other PDF content")
+_PDF_BG_SINGLE = _make_pdf_bytes(
+    "Recipient: MOEMAX BULGARIA\n"
+    "MOMAX - ORDER\n"
+    "VARNA - 88801711/12.12.25\n"
+    "Term for delivery: 20.03.26\n"
+    "Address: Varna, Blvd. Vladislav Varnenchik 277A\n"
+)
+_PDF_B_VARNA_SHORT = _make_pdf_bytes(
+    "MOMAX - ORDER\n"
+    "VARNA - 88801711/12.12.25\n"
+    "Code/Type Quantity\n"
+    "SN/SN/71/SP/91/181 1\n"
+)
+_PDF_A_UNKNOWN_STORE = _make_pdf_bytes(
+    "Recipient: MOMAX BULGARIA\n"
+    "IDENT No: 20197304\n"
+    "ORDER\n"
+    "No 1711/12.12.25\n"
+    "Term for delivery: 20.03.26\n"
+    "Store: TEST\n"
+    "Address: Unknown Street 999, Unknown City\n"
+)
+_PDF_B_UNKNOWN_STORE = _make_pdf_bytes(
+    "MOMAX - ORDER\n"
+    "TEST - 88801711/12.12.25Ð³.\n"
+    "Code/Type Quantity\n"
+    "SN/SN/71/SP/91/181 1\n"
+)
+
+
+# LLM response shared by the BG pipeline tests; variants patch only the fields they exercise.
+_BASE_LLM_DICT: dict[str, Any] = {
+    "message_id": "test_momax_bg",
+    "received_at": "2026-02-13T12:00:00+00:00",
+    "header": {
+        "kundennummer": {"value": "20197304", "source": "pdf", "confidence": 0.99},
+        # Simulate LLM missing kom_nr; pipeline should recover from PDF text.
+        "kom_nr": {"value": "", "source": "pdf", "confidence": 0.0},
+        "kom_name": {"value": "VARNA", "source": "pdf", "confidence": 0.95},
+        "liefertermin": {"value": "20.03.26", "source": "pdf", "confidence": 0.95},
+        "bestelldatum": {"value": "12.12.25", "source": "derived", "confidence": 0.9},
+        "store_name": {"value": "MOMAX BULGARIA - VARNA", "source": "pdf", "confidence": 0.95},
+        "store_address": {"value": "Varna, Blvd. Vladislav Varnenchik 277A", "source": "pdf", "confidence": 0.95},
+        "lieferanschrift": {"value": "Varna, Blvd. Vladislav Varnenchik 277A", "source": "derived", "confidence": 0.9},
+        "reply_needed": {"value": False, "source": "derived", "confidence": 1.0},
+        "human_review_needed": {"value": False, "source": "derived", "confidence": 1.0},
+        "post_case": {"value": False, "source": "derived", "confidence": 1.0},
+    },
+    "items": [
+        {
+            "line_no": 1,
+            "artikelnummer": {"value": "181", "source": "pdf", "confidence": 0.9},
+            "modellnummer": {"value": "SN/SN/71/SP/91", "source": "pdf", "confidence": 0.9},
+            "menge": {"value": 1, "source": "pdf", "confidence": 0.9},
+            "furncloud_id": {"value": "", "source": "derived", "confidence": 0.0},
+        }
+    ],
+    "status": "ok",
+    "warnings": [],
+    "errors": [],
+}
+_BASE_LLM_JSON = json.dumps(_BASE_LLM_DICT)
+
+
+def _llm_json(message_id: str, **header_overrides: dict[str, Any]) -> str:
+    return json.dumps(
+        {
+            **_BASE_LLM_DICT,
+            "message_id": message_id,
+            "header": {**_BASE_LLM_DICT["header"], **header_overrides},
+        }
     )
 
+
+def test_momax_bg_two_pdf_special_case() -> None:
     message = IngestedEmail(
         message_id="test_momax_bg",
         received_at="2026-02-13T12:00:00+00:00",
@@ -47,61 +214,20 @@ def test_momax_bg_two_pdf_special_case() -> None:
         sender="bg@example.com",
         body_text="",
         attachments=[
-            Attachment(filename="bg_a.pdf", content_type="application/pdf", data=pdf_a),
-            Attachment(filename="bg_b.pdf", content_type="application/pdf", data=pdf_b),
+            Attachment(filename="bg_a.pdf", content_type="application/pdf", data=_PDF_A_VARNA),
+            Attachment(filename="bg_b.pdf", content_type="application/pdf", data=_PDF_B_VARNA),
         ],
     )
 
-    config = Config.from_env()
-    config.output_dir = Path("./tmp_momax_bg_verify")
-    config.output_dir.mkdir(exist_ok=True)
-
     # Force at least one PDF image so the "detail extraction" block would run unless guarded.
-    original_prepare_images = pipeline._prepare_images
-    pipeline._prepare_images = lambda attachments, config, warnings: [
-        ImageInput(name="dummy_pdf_page.png", source="pdf", data_url="data:image/png;base64,")
-    ]
-
-    try:
-        extractor = MagicMock()
-        extractor.extract.side_effect = RuntimeError("BG case must NOT call extractor.extract()")
-        extractor.extract_article_details.side_effect = RuntimeError(
-            "BG case must skip detail extraction"
+    with _stub_prepare_images():
+        extractor = _FakeExtractor(
+            extract=RuntimeError("BG case must NOT call extractor.extract()"),
+            extract_article_details=RuntimeError("BG case must skip detail extraction"),
+            create_response={"output_text": _BASE_LLM_JSON},
         )
 
-        mock_llm_json = {
-            "message_id": "test_momax_bg",
-            "received_at": "2026-02-13T12:00:00+00:00",
-            "header": {
-                "kundennummer": {"value": "20197304", "source": "pdf", "confidence": 0.99},
-                # Simulate LLM missing kom_nr; pipeline should recover from PDF text.
-                "kom_nr": {"value": "", "source": "pdf", "confidence": 0.0},
-                "kom_name": {"value": "VARNA", "source": "pdf", "confidence": 0.95},
-                "liefertermin": {"value": "20.03.26", "source": "pdf", "confidence": 0.95},
-                "bestelldatum": {"value": "12.12.25", "source": "derived", "confidence": 0.9},
-                "store_name": {"value": "MOMAX BULGARIA - VARNA", "source": "pdf", "confidence": 0.95},
-                "store_address": {"value": "Varna, Blvd. Vladislav Varnenchik 277A", "source": "pdf", "confidence": 0.95},
-                "lieferanschrift": {"value": "Varna, Blvd. Vladislav Varnenchik 277A", "source": "derived", "confidence": 0.9},
-                "reply_needed": {"value": False, "source": "derived", "confidence": 1.0},
-                "human_review_needed": {"value": False, "source": "derived", "confidence": 1.0},
-                "post_case": {"value": False, "source": "derived", "confidence": 1.0},
-            },
-            "items": [
-                {
-                    "line_no": 1,
-                    "artikelnummer": {"value": "181", "source": "pdf", "confidence": 0.9},
-                    "modellnummer": {"value": "SN/SN/71/SP/91", "source": "pdf", "confidence": 0.9},
-                    "menge": {"value": 1, "source": "pdf", "confidence": 0.9},
-                    "furncloud_id": {"value": "", "source": "derived", "confidence": 0.0},
-                }
-            ],
-            "status": "ok",
-            "warnings": [],
-            "errors": [],
-        }
-        extractor._create_response.return_value = {"output_text": json.dumps(mock_llm_json)}
-
-        result = pipeline.process_message(message, config, extractor)
+        result = pipeline.process_message(message, _CONFIG, extractor)
         header = result.data.get("header") or {}
 
         assert header.get("kundennummer", {}).get("value") == "68939"
@@ -110,12 +236,10 @@ def test_momax_bg_two_pdf_special_case() -> None:
         assert header.get("kom_nr", {}).get("value") == "88801711"
         assert header.get("reply_needed", {}).get("value") is False
 
-        extractor.extract.assert_not_called()
-        extractor.extract_article_details.assert_not_called()
+        assert extractor.calls["extract"] == 0
+        assert extractor.calls["extract_article_details"] == 0
 
         print("SUCCESS: Mömax BG two-PDF special-case path used and detail extraction skipped.")
-    finally:
-        pipeline._prepare_images = original_prepare_images
 
 
 def test_momax_bg_allowlist_address_matching() -> None:
@@ -136,6 +260,20 @@ def test_momax_bg_allowlist_address_matching() -> None:
     print("SUCCESS: momax_bg allowlist address matching picks expected rows.")
 
 
+def test_momax_bg_batch_lookup_matches_single() -> None:
+    addresses = [
+        "Varna, Blvd. Vladislav Varnenchik 277A",
+        "Slivnitza (Evropa) Blvd. 441\n1331 Sofia",
+        "Skopie Blvd 6\n1233 Sofia",
+        "",
+    ]
+    batch = lookup.find_momax_bg_customers_batch(addresses)
+    assert batch == [lookup.find_momax_bg_customer_by_address(a) for a in addresses]
+    assert batch[0] is not None and batch[0]["kundennummer"] == "68939"
+    assert batch[2] is None and batch[3] is None
+    print("SUCCESS: momax_bg batch lookup agrees with single-address lookup.")
+
+
 def test_momax_bg_allowlist_match_without_rapidfuzz() -> None:
     original_fuzz = lookup.fuzz
     try:
@@ -189,60 +327,44 @@ def test_momax_bg_no_match_does_not_fallback_to_standard_lookup() -> None:
 
 
 def test_non_bg_regression_calls_standard_extract() -> None:
-    pdf = _make_pdf_bytes("Some other PDF content")
     message = IngestedEmail(
         message_id="test_non_bg",
         received_at="2026-02-13T12:00:00+00:00",
         subject="Regular order",
         sender="test@example.com",
         body_text="",
-        attachments=[Attachment(filename="x.pdf", content_type="application/pdf", data=pdf)],
+        attachments=[Attachment(filename="x.pdf", content_type="application/pdf", data=_PDF_NON_BG)],
     )
-    config = Config.from_env()
-
-    original_prepare_images = pipeline._prepare_images
-    pipeline._prepare_images = lambda attachments, config, warnings: [
-        ImageInput(name="dummy_pdf_page.png", source="pdf", data_url="data:image/png;base64,")
-    ]
-
-    try:
-        extractor = MagicMock()
-        extractor._create_response.side_effect = RuntimeError("Non-BG must not use _create_response path")
-        extractor.extract.return_value = json.dumps(
-            {
-                "header": {
-                    "kundennummer": {"value": "123", "source": "email", "confidence": 1.0},
-                    "kom_nr": {"value": "KOM-1", "source": "email", "confidence": 1.0},
-                    "reply_needed": {"value": False, "source": "derived", "confidence": 1.0},
-                    "human_review_needed": {"value": False, "source": "derived", "confidence": 1.0},
-                    "post_case": {"value": False, "source": "derived", "confidence": 1.0},
-                },
-                "items": [],
-                "warnings": [],
-                "errors": [],
-                "status": "ok",
-            }
+    with _stub_prepare_images():
+        extractor = _FakeExtractor(
+            extract=json.dumps(
+                {
+                    "header": {
+                        "kundennummer": {"value": "123", "source": "email", "confidence": 1.0},
+                        "kom_nr": {"value": "KOM-1", "source": "email", "confidence": 1.0},
+                        "reply_needed": {"value": False, "source": "derived", "confidence": 1.0},
+                        "human_review_needed": {"value": False, "source": "derived", "confidence": 1.0},
+                        "post_case": {"value": False, "source": "derived", "confidence": 1.0},
+                    },
+                    "items": [],
+                    "warnings": [],
+                    "errors": [],
+                    "status": "ok",
+                }
+            ),
+            extract_article_details=json.dumps({}),
+            create_response=RuntimeError("Non-BG must not use _create_response path"),
         )
-        extractor.extract_article_details.return_value = json.dumps({})
 
-        pipeline.process_message(message, config, extractor)
-        extractor.extract.assert_called()
-        extractor.extract_article_details.assert_called()
-        extractor._create_response.assert_not_called()
+        pipeline.process_message(message, _CONFIG, extractor)
+        assert extractor.calls["extract"] > 0
+        assert extractor.calls["extract_article_details"] > 0
+        assert extractor.calls["_create_response"] == 0
         print("SUCCESS: Non-BG case uses standard extractor.extract().")
-    finally:
-        pipeline._prepare_images = original_prepare_images
 
 
 def test_momax_bg_single_pdf_detection() -> None:
-    pdf = _make_pdf_bytes(
-        "Recipient: MOEMAX BULGARIA\n"
-        "MOMAX - ORDER\n"
-        "VARNA - 88801711/12.12.25\n"
-        "Term for delivery: 20.03.26\n"
-        "Address: Varna, Blvd. Vladislav Varnenchik 277A\n"
-    )
-    att = Attachment(filename="single.pdf", content_type="application/pdf", data=pdf)
+    att = Attachment(filename="single.pdf", content_type="application/pdf", data=_PDF_BG_SINGLE)
     assert momax_bg.is_momax_bg_two_pdf_case([att]) is True
     assert momax_bg.extract_momax_bg_kom_nr([att]) == "88801711"
     assert momax_bg.extract_momax_bg_order_date([att]) == "12.12.25"
@@ -250,21 +372,6 @@ def test_momax_bg_single_pdf_detection() -> None:
 
 
 def test_momax_bg_bestelldatum_fallback_from_pdf_suffix() -> None:
-    pdf_a = _make_pdf_bytes(
-        "Recipient: MOMAX BULGARIA\n"
-        "IDENT No: 20197304\n"
-        "ORDER\n"
-        "No 1711/12.12.25\n"
-        "Term for delivery: 20.03.26\n"
-        "Store: VARNA\n"
-        "Address: Varna, Blvd. Vladislav Varnenchik 277A\n"
-    )
-    pdf_b = _make_pdf_bytes(
-        "MOMAX - ORDER\n"
-        "VARNA - 88801711/12.12.25\n"
-        "Code/Type Quantity\n"
-        "SN/SN/71/SP/91/181 1\n"
-    )
     message = IngestedEmail(
         message_id="test_momax_bg_date_fallback",
         received_at="2026-02-13T12:00:00+00:00",
@@ -272,83 +379,31 @@ def test_momax_bg_bestelldatum_fallback_from_pdf_suffix() -> None:
         sender="bg@example.com",
         body_text="",
         attachments=[
-            Attachment(filename="bg_a.pdf", content_type="application/pdf", data=pdf_a),
-            Attachment(filename="bg_b.pdf", content_type="application/pdf", data=pdf_b),
+            Attachment(filename="bg_a.pdf", content_type="application/pdf", data=_PDF_A_VARNA),
+            Attachment(filename="bg_b.pdf", content_type="application/pdf", data=_PDF_B_VARNA_SHORT),
         ],
     )
-    config = Config.from_env()
-
-    original_prepare_images = pipeline._prepare_images
-    pipeline._prepare_images = lambda attachments, config, warnings: [
-        ImageInput(name="dummy_pdf_page.png", source="pdf", data_url="data:image/png;base64,")
-    ]
-
-    try:
-        extractor = MagicMock()
-        extractor.extract.side_effect = RuntimeError("BG case must NOT call extractor.extract()")
-        extractor.extract_article_details.side_effect = RuntimeError(
-            "BG case must skip detail extraction"
+    with _stub_prepare_images():
+        extractor = _FakeExtractor(
+            extract=RuntimeError("BG case must NOT call extractor.extract()"),
+            extract_article_details=RuntimeError("BG case must skip detail extraction"),
+            create_response={
+                "output_text": _llm_json(
+                    "test_momax_bg_date_fallback",
+                    bestelldatum={"value": "", "source": "pdf", "confidence": 0.0},
+                )
+            },
         )
-        extractor._create_response.return_value = {
-            "output_text": json.dumps(
-                {
-                    "message_id": "test_momax_bg_date_fallback",
-                    "received_at": "2026-02-13T12:00:00+00:00",
-                    "header": {
-                        "kundennummer": {"value": "20197304", "source": "pdf", "confidence": 0.99},
-                        "kom_nr": {"value": "", "source": "pdf", "confidence": 0.0},
-                        "kom_name": {"value": "VARNA", "source": "pdf", "confidence": 0.9},
-                        "liefertermin": {"value": "20.03.26", "source": "pdf", "confidence": 0.9},
-                        "bestelldatum": {"value": "", "source": "pdf", "confidence": 0.0},
-                        "store_name": {"value": "MOMAX BULGARIA - VARNA", "source": "pdf", "confidence": 0.9},
-                        "store_address": {"value": "Varna, Blvd. Vladislav Varnenchik 277A", "source": "pdf", "confidence": 0.9},
-                        "lieferanschrift": {"value": "Varna, Blvd. Vladislav Varnenchik 277A", "source": "pdf", "confidence": 0.9},
-                        "reply_needed": {"value": False, "source": "derived", "confidence": 1.0},
-                        "human_review_needed": {"value": False, "source": "derived", "confidence": 1.0},
-                        "post_case": {"value": False, "source": "derived", "confidence": 1.0},
-                    },
-                    "items": [
-                        {
-                            "line_no": 1,
-                            "artikelnummer": {"value": "181", "source": "pdf", "confidence": 0.9},
-                            "modellnummer": {"value": "SN/SN/71/SP/91", "source": "pdf", "confidence": 0.9},
-                            "menge": {"value": 1, "source": "pdf", "confidence": 0.9},
-                            "furncloud_id": {"value": "", "source": "derived", "confidence": 0.0},
-                        }
-                    ],
-                    "status": "ok",
-                    "warnings": [],
-                    "errors": [],
-                }
-            )
-        }
 
-        result = pipeline.process_message(message, config, extractor)
+        result = pipeline.process_message(message, _CONFIG, extractor)
         header = result.data.get("header") or {}
         assert header.get("kom_nr", {}).get("value") == "88801711"
         assert header.get("bestelldatum", {}).get("value") == "12.12.25"
         assert header.get("bestelldatum", {}).get("derived_from") == "pdf_order_suffix"
         print("SUCCESS: momax_bg derives bestelldatum from PDF order suffix when missing.")
-    finally:
-        pipeline._prepare_images = original_prepare_images
 
 
 def test_momax_bg_no_raw_kdnr_fallback_from_pdf() -> None:
-    pdf_a = _make_pdf_bytes(
-        "Recipient: MOMAX BULGARIA\n"
-        "IDENT No: 20197304\n"
-        "ORDER\n"
-        "No 1711/12.12.25\n"
-        "Term for delivery: 20.03.26\n"
-        "Store: TEST\n"
-        "Address: Unknown Street 999, Unknown City\n"
-    )
-    pdf_b = _make_pdf_bytes(
-        "MOMAX - ORDER\n"
-        "TEST - 88801711/12.12.25Ð³.\n"
-        "Code/Type Quantity\n"
-        "SN/SN/71/SP/91/181 1\n"
-    )
     message = IngestedEmail(
         message_id="test_momax_bg_no_raw_fallback",
         received_at="2026-02-13T12:00:00+00:00",
@@ -356,69 +411,36 @@ def test_momax_bg_no_raw_kdnr_fallback_from_pdf() -> None:
         sender="bg@example.com",
         body_text="",
         attachments=[
-            Attachment(filename="bg_a.pdf", content_type="application/pdf", data=pdf_a),
-            Attachment(filename="bg_b.pdf", content_type="application/pdf", data=pdf_b),
+            Attachment(filename="bg_a.pdf", content_type="application/pdf", data=_PDF_A_UNKNOWN_STORE),
+            Attachment(filename="bg_b.pdf", content_type="application/pdf", data=_PDF_B_UNKNOWN_STORE),
         ],
     )
-    config = Config.from_env()
-
-    original_prepare_images = pipeline._prepare_images
-    pipeline._prepare_images = lambda attachments, config, warnings: [
-        ImageInput(name="dummy_pdf_page.png", source="pdf", data_url="data:image/png;base64,")
-    ]
-
-    try:
-        extractor = MagicMock()
-        extractor.extract.side_effect = RuntimeError("BG case must NOT call extractor.extract()")
-        extractor.extract_article_details.side_effect = RuntimeError(
-            "BG case must skip detail extraction"
+    with _stub_prepare_images():
+        extractor = _FakeExtractor(
+            extract=RuntimeError("BG case must NOT call extractor.extract()"),
+            extract_article_details=RuntimeError("BG case must skip detail extraction"),
+            create_response={
+                "output_text": _llm_json(
+                    "test_momax_bg_no_raw_fallback",
+                    kom_name={"value": "TEST", "source": "pdf", "confidence": 0.9},
+                    store_name={"value": "MOMAX BULGARIA - TEST", "source": "pdf", "confidence": 0.9},
+                    store_address={"value": "Unknown Street 999, Unknown City", "source": "pdf", "confidence": 0.9},
+                    lieferanschrift={"value": "Unknown Street 999, Unknown City", "source": "pdf", "confidence": 0.9},
+                )
+            },
         )
-        extractor._create_response.return_value = {
-            "output_text": json.dumps(
-                {
-                    "message_id": "test_momax_bg_no_raw_fallback",
-                    "received_at": "2026-02-13T12:00:00+00:00",
-                    "header": {
-                        "kundennummer": {"value": "20197304", "source": "pdf", "confidence": 0.99},
-                        "kom_nr": {"value": "", "source": "pdf", "confidence": 0.0},
-                        "kom_name": {"value": "TEST", "source": "pdf", "confidence": 0.9},
-                        "liefertermin": {"value": "20.03.26", "source": "pdf", "confidence": 0.9},
-                        "bestelldatum": {"value": "12.12.25", "source": "derived", "confidence": 0.9},
-                        "store_name": {"value": "MOMAX BULGARIA - TEST", "source": "pdf", "confidence": 0.9},
-                        "store_address": {"value": "Unknown Street 999, Unknown City", "source": "pdf", "confidence": 0.9},
-                        "lieferanschrift": {"value": "Unknown Street 999, Unknown City", "source": "pdf", "confidence": 0.9},
-                        "reply_needed": {"value": False, "source": "derived", "confidence": 1.0},
-                        "human_review_needed": {"value": False, "source": "derived", "confidence": 1.0},
-                        "post_case": {"value": False, "source": "derived", "confidence": 1.0},
-                    },
-                    "items": [
-                        {
-                            "line_no": 1,
-                            "artikelnummer": {"value": "181", "source": "pdf", "confidence": 0.9},
-                            "modellnummer": {"value": "SN/SN/71/SP/91", "source": "pdf", "confidence": 0.9},
-                            "menge": {"value": 1, "source": "pdf", "confidence": 0.9},
-                            "furncloud_id": {"value": "", "source": "derived", "confidence": 0.0},
-                        }
-                    ],
-                    "status": "ok",
-                    "warnings": [],
-                    "errors": [],
-                }
-            )
-        }
 
-        result = pipeline.process_message(message, config, extractor)
+        result = pipeline.process_message(message, _CONFIG, extractor)
         header = result.data.get("header") or {}
         assert header.get("kundennummer", {}).get("value") == ""
         assert header.get("kundennummer", {}).get("derived_from") == "excel_lookup_failed"
         print("SUCCESS: momax_bg does not fallback to raw PDF kundennummer when address lookup fails.")
-    finally:
-        pipeline._prepare_images = original_prepare_images
 
 
 if __name__ == "__main__":
     test_momax_bg_two_pdf_special_case()
     test_momax_bg_allowlist_address_matching()
+    test_momax_bg_batch_lookup_matches_single()
     test_momax_bg_allowlist_match_without_rapidfuzz()
     test_momax_bg_no_match_does_not_fallback_to_standard_lookup()
     test_momax_bg_single_pdf_detection()
@@ -1,7 +1,10 @@
+from pathlib import Path
+import tempfile
+
 from normalize import normalize_output
-from xml_exporter import export_xmls
+from xml_exporter import build_order_info_xml, export_xmls
 from config import Config
-from pathlib import Path
+from prompts_detail import resolve_manufacturer_iln
 
 def test_full_pipeline_iln():
     data = {
@@ -15,26 +18,55 @@ def test_full_pipeline_iln():
             {"artikelnummer": "ART1", "modellnummer": "MOD1", "menge": "1"}
         ]
     }
-    
+
     warnings = []
     normalized = normalize_output(data, "test_msg", "2024-01-20T10:00:00", True, warnings)
-    
-    print("Normalized Header ILN:", normalized.get("header", {}).get("iln"))
-    
-    config = Config()
-    output_dir = Path("./test_output_iln")
-    export_xmls(normalized, "test_base", config, output_dir)
-    
-    # Check XML content
-    xml_path = output_dir / "OrderInfo_test_base.xml"
-    if xml_path.exists():
-        with open(xml_path, "r", encoding="utf-8") as f:
-            content = f.read()
-            if 'ILN="9007019005065"' in content:
-                print("XML Export SUCCESS: ILN found in XML")
-            else:
-                print("XML Export FAILURE: ILN not found or incorrect in XML")
-                print(content)
+    header = normalized.get("header", {})
+
+    print("Normalized Header ILN:", header.get("iln"))
+    if (header.get("iln") or {}).get("value") == "9007019005065":
+        print("ILN Lookup SUCCESS: ILN derived from delivery address")
+    else:
+        print("ILN Lookup FAILURE: ILN not found or incorrect in header")
+
+    # Check XML content in memory; export_xmls only adds the file writes on top.
+    content = build_order_info_xml(normalized, Config.from_env())
+    if 'CommissionNumber="KOM123"' in content:
+        print("XML Export SUCCESS: CommissionNumber found in XML")
+    else:
+        print("XML Export FAILURE: CommissionNumber not found or incorrect in XML")
+        print(content)
+
+def test_manufacturer_iln_lookup():
+    # A known name with a company suffix still resolves; unknown non-Staud names must not get Staud's ILN.
+    assert resolve_manufacturer_iln("Rauch Möbelwerke GmbH") == "4003769000008"
+    assert resolve_manufacturer_iln("Hülsta") == ""
+    assert resolve_manufacturer_iln("") == "4039262000004"
+    print("Manufacturer ILN Lookup SUCCESS")
+
+def test_xml_export_layout():
+    # Pins the exported bytes: the writer rewrites ElementTree's " />" and &#10; output chunk
+    # by chunk, so a change in how the stdlib emits them must fail here, not reach the files.
+    data = {
+        "header": {"kom_nr": "KOM123", "lieferanschrift": "Hauptstr. 5\n12345 Berlin"},
+        "items": [{"artikelnummer": "ART1", "modellnummer": "MOD1", "menge": 1}],
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        order_info, article_info = (
+            path.read_bytes() for path in export_xmls(data, "test_msg", Config.from_env(), Path(tmp_dir))
+        )
+    assert order_info == (
+        b'<?xml version="1.0" ?>\n'
+        b"<Order>\n"
+        b'  <OrderInformations OrderID="" DealerNumberAtManufacturer="" CommissionNumber="KOM123" '
+        b'CommissionName="" DateOfDelivery="" StoreName="" StoreAddress="" Seller="" '
+        b'DeliveryAddress="Hauptstr. 5\n12345 Berlin" ASAP="1"/>\n'
+        b"</Order>\n"
+    ), order_info
+    assert b"\n        <transaction_ID/>\n        <Language>de</Language>\n" in article_info, article_info[:400]
+    print("XML Layout SUCCESS")
 
 if __name__ == "__main__":
     test_full_pipeline_iln()
+    test_manufacturer_iln_lookup()
+    test_xml_export_layout()
@@ -1,23 +1,36 @@
 import json
+import logging
 import tempfile
 from pathlib import Path
-from unittest.mock import MagicMock
 from pipeline import process_message, ProcessedResult
 from normalize import normalize_output
 from config import Config
 from email_ingest import IngestedEmail
 import app as dashboard_app
 
+logger = logging.getLogger(__name__)
+
+
+class _StubExtractor:
+    """Stands in for OpenAIExtractor: extract() returns the canned LLM JSON, other calls return nothing."""
+
+    def __init__(self, response_text: str) -> None:
+        self._response_text = response_text
+
+    def extract(self, *args, **kwargs) -> str:
+        return self._response_text
+
+    def classify_order_format(self, *args, **kwargs) -> None:
+        return None
+
+    def complete_text(self, *args, **kwargs) -> str:
+        return ""
+
 
 def test_reply_needed_preservation():
     # Mock configuration
     config = Config.from_env()
-    config.output_dir = Path("./test_output_reply_needed")
-    config.output_dir.mkdir(exist_ok=True)
 
-    # Mock Extractor
-    extractor = MagicMock()
-    
     # Mock LLM Response with reply_needed = True
     mock_response = {
         "header": {
@@ -30,8 +43,8 @@ def test_reply_needed_preservation():
         "errors": []
     }
     
-    # Mock extraction method
-    extractor.extract.return_value = json.dumps(mock_response)
+    # Mock Extractor
+    extractor = _StubExtractor(json.dumps(mock_response))
 
     # Create dummy message
     message = IngestedEmail(
@@ -47,50 +60,66 @@ def test_reply_needed_preservation():
     result = process_message(message, config, extractor)
     
     # Check if normalized data has the flag
-    print("Normalized Data Reply Needed:", result.data["header"].get("reply_needed"))
+    logger.info("Normalized Data Reply Needed: %s", result.data["header"].get("reply_needed"))
     
     # Verify the value is strictly True or boolean-like
     flag = result.data["header"].get("reply_needed", {}).get("value")
     if flag is True:
-        print("SUCCESS: Reply needed flag preserved as True.")
+        logger.info("SUCCESS: Reply needed flag preserved as True.")
     else:
-        print(f"FAILURE: Reply needed flag is {flag}")
+        logger.info("FAILURE: Reply needed flag is %s", flag)
 
-    # Write to disk effectively simulating the app
-    output_path = config.output_dir / "test_reply_needed.json"
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(result.data, f, indent=2)
+    # Write to disk effectively simulating the app, in a throwaway output dir
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config.output_dir = Path(tmp_dir)
+        output_path = config.output_dir / "test_reply_needed.json"
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(result.data, f, ensure_ascii=False, indent=2)
 
-    print(f"Written to {output_path}")
 
+def _email_field(value, confidence: float = 1.0) -> dict:
+    return {"value": value, "source": "email", "confidence": confidence}
 
-def test_reply_needed_from_missing_critical_fields() -> None:
-    warnings: list[str] = []
-    data = {
-        "header": {
-            "kundennummer": {"value": "123456", "source": "email", "confidence": 1.0},
-            "reply_needed": {"value": False, "source": "email", "confidence": 1.0},
-        },
-        "items": [
-            {
-                "artikelnummer": {"value": "A-1", "source": "email", "confidence": 1.0},
-                "modellnummer": {"value": "M-1", "source": "email", "confidence": 1.0},
-                "menge": {"value": 1, "source": "email", "confidence": 1.0},
-                "furncloud_id": {"value": "FC-1", "source": "email", "confidence": 1.0},
-            }
-        ],
-        "warnings": [],
-        "errors": [],
-    }
-    normalized = normalize_output(
+
+_BASE_ITEM = {
+    "artikelnummer": _email_field("A-1"),
+    "modellnummer": _email_field("M-1"),
+    "menge": _email_field(1),
+    "furncloud_id": _email_field("FC-1"),
+}
+
+
+def _base_item(**overrides: dict) -> dict:
+    """Fresh copy of _BASE_ITEM (normalize_output may edit entries in place) with fields replaced."""
+    item = {key: dict(entry) for key, entry in _BASE_ITEM.items()}
+    item.update(overrides)
+    return item
+
+
+def _normalize_order(header: dict, message_id: str, items: list[dict] | None = None, email_body: str = "") -> dict:
+    """Run normalize_output on an email order; items default to one copy of _BASE_ITEM."""
+    if items is None:
+        items = [_base_item()]
+    data = {"header": header, "items": items, "warnings": [], "errors": []}
+    return normalize_output(
         data=data,
-        message_id="test_missing_critical",
+        message_id=message_id,
         received_at="2026-02-12T12:00:00+00:00",
         dayfirst=True,
-        warnings=warnings,
-        email_body="",
+        warnings=[],
+        email_body=email_body,
         sender="test@example.com",
     )
+
+
+def test_reply_needed_from_missing_critical_fields() -> None:
+    normalized = _normalize_order(
+        {
+            "kundennummer": _email_field("123456"),
+            "reply_needed": _email_field(False),
+        },
+        "test_missing_critical",
+    )
     reply_needed = normalized["header"].get("reply_needed", {}).get("value")
     warning_list = normalized.get("warnings") if isinstance(normalized.get("warnings"), list) else []
     expected_reply_warning = "Reply needed: Missing critical header fields: kom_nr"
@@ -101,145 +130,68 @@ def test_reply_needed_from_missing_critical_fields() -> None:
         isinstance(w, str) and w.startswith("Missing header fields:")
         for w in warning_list
     ), "Missing header fields warning should still be present"
-    print("SUCCESS: Missing critical header fields now force reply_needed and warning output.")
+    logger.info("SUCCESS: Missing critical header fields now force reply_needed and warning output.")
 
 
 def test_reply_needed_from_missing_kundennummer() -> None:
-    warnings: list[str] = []
-    data = {
-        "header": {
-            "kom_nr": {"value": "KOM-99", "source": "email", "confidence": 1.0},
-            "reply_needed": {"value": False, "source": "email", "confidence": 1.0},
+    normalized = _normalize_order(
+        {
+            "kom_nr": _email_field("KOM-99"),
+            "reply_needed": _email_field(False),
         },
-        "items": [
-            {
-                "artikelnummer": {"value": "A-1", "source": "email", "confidence": 1.0},
-                "modellnummer": {"value": "M-1", "source": "email", "confidence": 1.0},
-                "menge": {"value": 1, "source": "email", "confidence": 1.0},
-                "furncloud_id": {"value": "FC-1", "source": "email", "confidence": 1.0},
-            }
-        ],
-        "warnings": [],
-        "errors": [],
-    }
-    normalized = normalize_output(
-        data=data,
-        message_id="test_missing_kundennummer",
-        received_at="2026-02-12T12:00:00+00:00",
-        dayfirst=True,
-        warnings=warnings,
-        email_body="",
-        sender="test@example.com",
+        "test_missing_kundennummer",
     )
     warning_list = normalized.get("warnings") if isinstance(normalized.get("warnings"), list) else []
     assert normalized["header"].get("reply_needed", {}).get("value") is True
     assert "Reply needed: Missing critical header fields: kundennummer" in warning_list
-    print("SUCCESS: Missing kundennummer also triggers reply_needed.")
+    logger.info("SUCCESS: Missing kundennummer also triggers reply_needed.")
 
 
 def test_reply_needed_from_missing_critical_item_fields() -> None:
-    warnings: list[str] = []
-    data = {
-        "header": {
-            "kom_nr": {"value": "KOM-99", "source": "email", "confidence": 1.0},
-            "kundennummer": {"value": "123456", "source": "email", "confidence": 1.0},
-            "reply_needed": {"value": False, "source": "email", "confidence": 1.0},
+    normalized = _normalize_order(
+        {
+            "kom_nr": _email_field("KOM-99"),
+            "kundennummer": _email_field("123456"),
+            "reply_needed": _email_field(False),
         },
-        "items": [
-            {
-                "artikelnummer": {"value": "", "source": "email", "confidence": 0.0},
-                "modellnummer": {"value": "M-1", "source": "email", "confidence": 1.0},
-                "menge": {"value": 1, "source": "email", "confidence": 1.0},
-                "furncloud_id": {"value": "FC-1", "source": "email", "confidence": 1.0},
-            },
-            {
-                "artikelnummer": {"value": "A-2", "source": "email", "confidence": 1.0},
-                "modellnummer": {"value": "", "source": "email", "confidence": 0.0},
-                "menge": {"value": 1, "source": "email", "confidence": 1.0},
-                "furncloud_id": {"value": "FC-1", "source": "email", "confidence": 1.0},
-            },
+        "test_missing_item_critical",
+        items=[
+            _base_item(artikelnummer=_email_field("", confidence=0.0)),
+            _base_item(artikelnummer=_email_field("A-2"), modellnummer=_email_field("", confidence=0.0)),
         ],
-        "warnings": [],
-        "errors": [],
-    }
-    normalized = normalize_output(
-        data=data,
-        message_id="test_missing_item_critical",
-        received_at="2026-02-12T12:00:00+00:00",
-        dayfirst=True,
-        warnings=warnings,
-        email_body="",
-        sender="test@example.com",
     )
     warning_list = normalized.get("warnings") if isinstance(normalized.get("warnings"), list) else []
     assert normalized["header"].get("reply_needed", {}).get("value") is True
     assert "Reply needed: Missing critical item fields: artikelnummer (line 1), modellnummer (line 2)" in warning_list
-    print("SUCCESS: Missing artikelnummer/modellnummer now triggers reply_needed.")
+    logger.info("SUCCESS: Missing artikelnummer/modellnummer now triggers reply_needed.")
 
 
 def test_post_case_preservation() -> None:
-    warnings: list[str] = []
-    data = {
-        "header": {
-            "kom_nr": {"value": "KOM-99", "source": "email", "confidence": 1.0},
-            "kundennummer": {"value": "123456", "source": "email", "confidence": 1.0},
-            "post_case": {"value": True, "source": "email", "confidence": 1.0},
-            "reply_needed": {"value": False, "source": "email", "confidence": 1.0},
+    normalized = _normalize_order(
+        {
+            "kom_nr": _email_field("KOM-99"),
+            "kundennummer": _email_field("123456"),
+            "post_case": _email_field(True),
+            "reply_needed": _email_field(False),
         },
-        "items": [
-            {
-                "artikelnummer": {"value": "A-1", "source": "email", "confidence": 1.0},
-                "modellnummer": {"value": "M-1", "source": "email", "confidence": 1.0},
-                "menge": {"value": 1, "source": "email", "confidence": 1.0},
-                "furncloud_id": {"value": "FC-1", "source": "email", "confidence": 1.0},
-            }
-        ],
-        "warnings": [],
-        "errors": [],
-    }
-    normalized = normalize_output(
-        data=data,
-        message_id="test_post_case_preservation",
-        received_at="2026-02-12T12:00:00+00:00",
-        dayfirst=True,
-        warnings=warnings,
+        "test_post_case_preservation",
         email_body="WENN MOEGLICH BITTE KUNDE DIREKT PER POST ZUKOMMEN",
-        sender="test@example.com",
     )
     assert normalized["header"].get("post_case", {}).get("value") is True
-    print("SUCCESS: post_case=True preserved after normalization.")
+    logger.info("SUCCESS: post_case=True preserved after normalization.")
 
 
 def test_post_case_default_false_when_missing() -> None:
-    warnings: list[str] = []
-    data = {
-        "header": {
-            "kom_nr": {"value": "KOM-99", "source": "email", "confidence": 1.0},
-            "kundennummer": {"value": "123456", "source": "email", "confidence": 1.0},
-            "reply_needed": {"value": False, "source": "email", "confidence": 1.0},
+    normalized = _normalize_order(
+        {
+            "kom_nr": _email_field("KOM-99"),
+            "kundennummer": _email_field("123456"),
+            "reply_needed": _email_field(False),
         },
-        "items": [
-            {
-                "artikelnummer": {"value": "A-1", "source": "email", "confidence": 1.0},
-                "modellnummer": {"value": "M-1", "source": "email", "confidence": 1.0},
-                "menge": {"value": 1, "source": "email", "confidence": 1.0},
-                "furncloud_id": {"value": "FC-1", "source": "email", "confidence": 1.0},
-            }
-        ],
-        "warnings": [],
-        "errors": [],
-    }
-    normalized = normalize_output(
-        data=data,
-        message_id="test_post_case_default",
-        received_at="2026-02-12T12:00:00+00:00",
-        dayfirst=True,
-        warnings=warnings,
-        email_body="",
-        sender="test@example.com",
+        "test_post_case_default",
     )
     assert normalized["header"].get("post_case", {}).get("value") is False
-    print("SUCCESS: missing post_case defaults to False.")
+    logger.info("SUCCESS: missing post_case defaults to False.")
 
 
 def test_dashboard_list_orders_post_case_mapping() -> None:
@@ -265,10 +217,11 @@ def test_dashboard_list_orders_post_case_mapping() -> None:
         orders = dashboard_app._list_orders(temp_path)
     assert len(orders) == 1
     assert orders[0].get("post_case") is True
-    print("SUCCESS: dashboard _list_orders maps post_case correctly.")
+    logger.info("SUCCESS: dashboard _list_orders maps post_case correctly.")
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     test_reply_needed_preservation()
     test_reply_needed_from_missing_critical_fields()
     test_reply_needed_from_missing_kundennummer()
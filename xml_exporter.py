@@ -1,9 +1,11 @@
+import copy
+import io
 import xml.etree.ElementTree as ET
-from xml.dom import minidom
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, Iterator, List, TextIO, Tuple
 import re
+import string
 
 from config import Config
 
@@ -12,6 +14,33 @@ try:
 except Exception:
     _MANUFACTURER_ILN_MAP = {"staud": "4039262000004"}
 
+# Resolved once: lookup keys are the stripped, lowercased manufacturer names; values are ILN strings.
+_MANUFACTURER_ILN_MAP_LOWER = {str(k).strip().lower(): str(v or "") for k, v in _MANUFACTURER_ILN_MAP.items()}
+_STAUD_ILN = _MANUFACTURER_ILN_MAP_LOWER.get("staud", "4039262000004")
+
+_SANITIZE_RE = re.compile(r"[^A-Za-z0-9._-]+")
+_FILENAME_SAFE_CHARS = frozenset(string.ascii_letters + string.digits + "._-")
+# _normalize_address_spacing fixes, applied in one scan. Each alternative consumes
+# exactly what its former standalone pass consumed, except the ZIP one, which
+# stops before the 5-digit ZIP so a following country code ("...38112D-...")
+# still matches on the ZIP's last digit.
+_ADDRESS_SPACING_RE = re.compile(
+    # 1. Country code prefix (D-, A-, CH-) glued to a preceding digit: "103D-46149"
+    r"(?P<country_code>\d[A-Z]{1,2}-\d)"
+    # 2. 1-3 digit house number glued to a 5-digit German ZIP: "2238112".
+    #    Only 6-8 digit runs, never after a country code hyphen (D-46149).
+    r"|(?P<house_number>(?<![-\d])\d{1,3}(?=\d{5}(?:\s|$|[A-Z])))"
+    # 3. Country name glued to a preceding letter: "NastättenGermany"
+    r"|(?P<country_name>[a-zA-ZäöüÄÖÜß/]"
+    r"(?:Germany|Deutschland|Austria|Österreich|Switzerland|Schweiz|France|Frankreich"
+    r"|Belgium|Belgien|Netherlands|Niederlande|Italy|Italien)(?=\s|$))"
+)
+# Store names (lowercased) whose orders default to Staud when the program section is missing
+_STAUD_STORE_RE = re.compile(r"xxxlutz|mömax|moemax|bdsk")
+_WEEK_WORD_RE = re.compile(r"(\d{4})\s*Week\s*-\s*(\d{1,2})\b", re.IGNORECASE)
+_KW_RE = re.compile(r"(?:KW|Woche)\s*(\d{1,2})\s*[/.-]?\s*(\d{4})", re.IGNORECASE)
+
+
 def _get_val(data: Dict[str, Any], key: str, default: str = "") -> str:
     """Helper to safely get value from data dict structure."""
     if not data:
@@ -26,7 +55,10 @@ def _sanitize_for_filename(value: str) -> str:
     """Keep only alphanumeric, underscore, hyphen; safe for filenames and _SAFE_ID_RE."""
     if not value:
         return ""
-    s = re.sub(r"[^A-Za-z0-9._-]+", "_", str(value).strip())
+    s = str(value).strip()
+    # Ticket/KOM numbers are usually clean already; skip the regex for them.
+    if not _FILENAME_SAFE_CHARS.issuperset(s):
+        s = _SANITIZE_RE.sub("_", s)
     return s.strip("_") or ""
 
 
@@ -44,40 +76,73 @@ def _effective_xml_base_name(data: Dict[str, Any]) -> str:
         return kom_name
     return "unknown"
 
+
+_XML_DECLARATION = '<?xml version="1.0" ?>\n'
+# ElementTree escapes whitespace in attribute values as char refs; the exported files
+# carry them raw (multi-line DeliveryAddress), as the former minidom output did.
+_ATTR_WHITESPACE_REFS = (("&#10;", "\n"), ("&#13;", "\r"), ("&#09;", "\t"))
+
+
+class _ExportWriter:
+    """Text sink for ElementTree.write that keeps the exported files' layout.
+
+    ElementTree emits each empty-tag close (" />") and each attribute as its own
+    chunk, so the fixups can be applied per write while streaming.
+    """
+
+    def __init__(self, handle: TextIO) -> None:
+        self._handle = handle
+
+    def write(self, chunk: str) -> int:
+        if chunk == " />":
+            chunk = "/>"
+        elif "&#" in chunk:
+            for ref, char in _ATTR_WHITESPACE_REFS:
+                chunk = chunk.replace(ref, char)
+        return self._handle.write(chunk)
+
+
+def _write_pretty_xml(root: ET.Element, handle: TextIO) -> None:
+    """Indent root in place and stream it, with declaration, to handle."""
+    ET.indent(root, space="  ")
+    handle.write(_XML_DECLARATION)
+    ET.ElementTree(root).write(_ExportWriter(handle), encoding="unicode")
+    handle.write("\n")
+
+
 def _prettify_xml(elem: ET.Element) -> str:
-    """Return a pretty-printed XML string for the Element."""
-    rough_string = ET.tostring(elem, "utf-8")
-    reparsed = minidom.parseString(rough_string)
-    # The default prettify adds separate lines which is good, but we want to match the minimal style if possible.
-    # actually minidom prettify is fine.
-    return reparsed.toprettyxml(indent="  ")
+    """Return a pretty-printed XML string for the Element (indents elem in place)."""
+    buffer = io.StringIO()
+    _write_pretty_xml(elem, buffer)
+    return buffer.getvalue()
+
+
+def _write_xml(output_path: Path, root: ET.Element) -> None:
+    with open(output_path, "w", encoding="utf-8") as f:
+        _write_pretty_xml(root, f)
+
 
 def _normalize_address_spacing(address: str) -> str:
     """Fix missing spaces in address strings between components."""
     if not address:
         return address
     
-    # 1. Insert space before country code prefix (D-, A-, CH-) when preceded by digit
-    #    Example: "103D-46149" -> "103 D-46149"
-    address = re.sub(r'(\d)([A-Z]{1,2}-\d)', r'\1 \2', address)
-    
-    # 2. Insert space before 5-digit German ZIP when preceded by 1-3 digit house number
-    #    Example: "2238112" -> "22 38112"
-    #    IMPORTANT: Only match 6-8 consecutive digits to avoid splitting already-formatted ZIPs
-    #    Use negative lookbehinds to avoid:
-    #    - Splitting after country code hyphen (D-46149)
-    #    - Splitting in middle of digit sequences (would create "3 8112" from "38112")
-    address = re.sub(r'(?<![-\d])(\d{1,3})(\d{5})(?=\s|$|[A-Z])', r'\1 \2', address)
-    
     # Note: Austrian 4-digit ZIP pattern removed - it was incorrectly splitting German 5-digit ZIPs
-    # Austrian addresses with "A-" prefix are handled by step 1 above
-    
-    # 3. Insert space before country names when preceded by letter
-    #    Example: "NastättenGermany" -> "Nastätten Germany"
-    countries = r'(Germany|Deutschland|Austria|Österreich|Switzerland|Schweiz|France|Frankreich|Belgium|Belgien|Netherlands|Niederlande|Italy|Italien)'
-    address = re.sub(rf'([a-zA-ZäöüÄÖÜß/])({countries})(?=\s|$)', r'\1 \2', address)
-    
-    return address
+    # Austrian addresses with "A-" prefix are handled by the country code fix
+    return _ADDRESS_SPACING_RE.sub(_insert_address_space, address)
+
+
+def _insert_address_space(match: re.Match) -> str:
+    text = match.group()
+    if match.lastgroup == "house_number":
+        return text + " "
+    return f"{text[0]} {text[1:]}"
+
+
+# OCR prefix fixes for _fix_article_id_ocr, keyed by prefix length
+_OCR_FIX_5 = {"CQSNI": "CQSN1"}
+_OCR_FIX_4 = {"CQI6": "CQ16", "OI00": "OJ00", "ZBO0": "ZB00"}
+_OCR_FIX_FIRST_CHARS = frozenset(prefix[0] for prefix in (*_OCR_FIX_5, *_OCR_FIX_4))
 
 
 def _fix_article_id_ocr(article_id: str) -> str:
@@ -90,48 +155,41 @@ def _fix_article_id_ocr(article_id: str) -> str:
     - OI00  -> OJ00  (accessory prefix: I mistaken for J)
     - ZBO0  -> ZB00  (general: O mistaken for 0)
     """
-    if not article_id:
+    if not article_id or article_id[0] not in _OCR_FIX_FIRST_CHARS:
         return article_id
-    
-    # Pattern 1: Cabinet prefix - CQSNI -> CQSN1
-    # Example: CQSNI6TP... -> CQSN16TP..., CQSNI699... -> CQSN1699...
-    if article_id.startswith("CQSNI"):
-        article_id = "CQSN1" + article_id[5:]
-    
-    # Pattern 2: Bed prefix - CQI6 -> CQ16
-    # Example: CQI616... -> CQ1616...
-    if article_id.startswith("CQI6"):
-        article_id = "CQ16" + article_id[4:]
-    
-    # Pattern 3: Accessory prefix - OI00 -> OJ00
-    # Example: OI00-66979 -> OJ00-66979
-    if article_id.startswith("OI00"):
-        article_id = "OJ00" + article_id[4:]
-    
-    # Pattern 4: General prefix O->0 fix - ZBO0 -> ZB00
-    # Also handle similar patterns where O appears where 0 is expected
-    if article_id.startswith("ZBO0"):
-        article_id = "ZB00" + article_id[4:]
-    
+    # The prefixes are mutually exclusive, so at most one fix applies.
+    replacement = _OCR_FIX_5.get(article_id[:5])
+    if replacement:
+        return replacement + article_id[5:]
+    replacement = _OCR_FIX_4.get(article_id[:4])
+    if replacement:
+        return replacement + article_id[4:]
     return article_id
 
 
 def _delivery_week_to_xml_format(value: str) -> str:
     """
     Convert delivery_week string to XML format YYYYWWWO (e.g. 2026 week 5 -> 202605WO).
-    Supports: "2026 Week - 05" (from delivery_logic) and "KW05/2026" or "KW 05/2026".
+    Supports: "2026 Week - 05" (from delivery_logic), "KW05/2026" or "KW 05/2026",
+    and values already in XML format ("202605WO", e.g. edited in the dashboard).
     """
     if not value or not str(value).strip():
         return ""
     s = str(value).strip()
+    # Fast paths without the regex engine: "202605WO" and the compact "KW05/2026"
+    if len(s) == 8 and s.endswith("WO") and s.isascii() and s[:6].isdecimal():
+        return s if 1 <= int(s[4:6]) <= 53 else ""
+    if len(s) == 9 and s[:2].upper() == "KW" and s[4] in "/.-" and s[2:4].isdecimal() and s[5:].isdecimal():
+        week, year = int(s[2:4]), int(s[5:])
+        return f"{year}{week:02d}WO" if 1 <= week <= 53 else ""
     # "2026 Week - 05" (from delivery_logic)
-    m = re.match(r"(\d{4})\s*Week\s*-\s*(\d{1,2})\b", s, re.IGNORECASE)
+    m = _WEEK_WORD_RE.match(s)
     if m:
         year, week = int(m.group(1)), int(m.group(2))
         if 1 <= week <= 53:
             return f"{year}{week:02d}WO"
     # "KW05/2026" or "KW 05 / 2026"
-    m = re.search(r"(?:KW|Woche)\s*(\d{1,2})\s*[/.-]?\s*(\d{4})", s, re.IGNORECASE)
+    m = _KW_RE.search(s)
     if m:
         week, year = int(m.group(1)), int(m.group(2))
         if 1 <= week <= 53:
@@ -139,10 +197,7 @@ def _delivery_week_to_xml_format(value: str) -> str:
     return ""
 
 
-def generate_order_info_xml(data: Dict[str, Any], base_name: str, config: Config, output_dir: Path) -> Path:
-    """
-    Generates OrderInfo_TIMESTAMP.xml
-    """
+def _build_order_info_root(data: Dict[str, Any], config: Config) -> ET.Element:
     header = data.get("header", {})
     
     # Root element
@@ -160,35 +215,44 @@ def generate_order_info_xml(data: Dict[str, Any], base_name: str, config: Config
     # DealerNumberAtManufacturer -> kundennummer
     # ASAP -> "1" (hardcoded/default)
     
-    order_info = ET.SubElement(root, "OrderInformations")
-    order_info.set("OrderID", _get_val(header, "ticket_number"))
-    order_info.set("DealerNumberAtManufacturer", _get_val(header, "kundennummer"))
-    order_info.set("CommissionNumber", _get_val(header, "kom_nr"))
-    order_info.set("CommissionName", _get_val(header, "kom_name"))
-    order_info.set("DateOfDelivery", _delivery_week_to_xml_format(_get_val(header, "delivery_week")))
-    order_info.set("StoreName", _get_val(header, "store_name"))
-    order_info.set("StoreAddress", _normalize_address_spacing(_get_val(header, "store_address")))
-    order_info.set("Seller", _get_val(header, "seller"))
-    
-    # Clean up address for XML attribute (single line or preserved? Example had raw newlines)
-    # The example had "Im Gewerbepark 1\n76863 Herxheim\nGermany" inside the attribute.
-    # So we keep newlines.
-    order_info.set("DeliveryAddress", _normalize_address_spacing(_get_val(header, "lieferanschrift")))
-    order_info.set("ASAP", "1") 
-
-    filename = f"OrderInfo_{base_name}.xml"
-    output_path = output_dir / filename
-    
-    xml_str = _prettify_xml(root)
-    
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(xml_str)
-        
+    # Attributes are serialized in this dict order.
+    ET.SubElement(root, "OrderInformations", {
+        "OrderID": _get_val(header, "ticket_number"),
+        "DealerNumberAtManufacturer": _get_val(header, "kundennummer"),
+        "CommissionNumber": _get_val(header, "kom_nr"),
+        "CommissionName": _get_val(header, "kom_name"),
+        "DateOfDelivery": _delivery_week_to_xml_format(_get_val(header, "delivery_week")),
+        "StoreName": _get_val(header, "store_name"),
+        "StoreAddress": _normalize_address_spacing(_get_val(header, "store_address")),
+        "Seller": _get_val(header, "seller"),
+        # Clean up address for XML attribute (single line or preserved? Example had raw newlines)
+        # The example had "Im Gewerbepark 1\n76863 Herxheim\nGermany" inside the attribute.
+        # So we keep newlines.
+        "DeliveryAddress": _normalize_address_spacing(_get_val(header, "lieferanschrift")),
+        "ASAP": "1",
+    })
+
+    return root
+
+
+def build_order_info_xml(data: Dict[str, Any], config: Config) -> str:
+    """
+    Builds the OrderInfo XML document as a string (no file I/O).
+    """
+    return _prettify_xml(_build_order_info_root(data, config))
+
+
+def generate_order_info_xml(data: Dict[str, Any], base_name: str, config: Config, output_dir: Path) -> Path:
+    """
+    Generates OrderInfo_TIMESTAMP.xml
+    """
+    output_path = output_dir / f"OrderInfo_{base_name}.xml"
+    _write_xml(output_path, _build_order_info_root(data, config))
     return output_path
 
-def generate_article_info_xml(data: Dict[str, Any], base_name: str, output_dir: Path) -> Path:
+
+def _build_article_info_root(data: Dict[str, Any]) -> ET.Element:
     """
-    Generates OrderArticleInfo_TIMESTAMP.xml
     Uses detailed article data from second extraction if available,
     otherwise falls back to basic items array.
     """
@@ -216,14 +280,13 @@ def generate_article_info_xml(data: Dict[str, Any], base_name: str, output_dir:
     manufacturer_name = str(program_info.get("manufacturer_name", "") or "")
     manufacturer_iln = str(program_info.get("manufacturer_iln", "") or "")
     if manufacturer_name and not manufacturer_iln:
-        manufacturer_iln = str(_MANUFACTURER_ILN_MAP.get(manufacturer_name.strip().lower(), "") or "")
+        manufacturer_iln = _MANUFACTURER_ILN_MAP_LOWER.get(manufacturer_name.strip().lower(), "")
 
     # Fallback for older/partial JSONs without program section: default to Staud for XXLUTZ/MÖMAX flows.
     if not manufacturer_name and not manufacturer_iln:
-        store_name = _get_val(header, "store_name", "").strip().lower()
-        if any(token in store_name for token in ("xxxlutz", "mömax", "moemax", "bdsk")):
+        if _STAUD_STORE_RE.search(_get_val(header, "store_name", "").lower()):
             manufacturer_name = "Staud"
-            manufacturer_iln = str(_MANUFACTURER_ILN_MAP.get("staud", "4039262000004") or "")
+            manufacturer_iln = _STAUD_ILN
 
     # manufacturer and ILN from program; prog_id and progname empty
     ET.SubElement(prog, "manufacturer_longname").text = manufacturer_name
@@ -232,14 +295,10 @@ def generate_article_info_xml(data: Dict[str, Any], base_name: str, output_dir:
     ET.SubElement(prog, "progname")
     
     # Global remarks (furncloud id)
-    furncloud_id = program_info.get("furncloud_id", "")
-    if not furncloud_id:
-        # Fallback: scan items for furncloud_id
-        for item in items:
-            val = _get_val(item, "furncloud_id")
-            if val:
-                furncloud_id = val
-                break
+    # Fallback: first non-empty furncloud_id among the items
+    furncloud_id = program_info.get("furncloud_id", "") or next(
+        (val for item in items if (val := _get_val(item, "furncloud_id"))), ""
+    )
     
     remarks = ET.SubElement(prog, "Remarks")
     if furncloud_id:
@@ -252,96 +311,102 @@ def generate_article_info_xml(data: Dict[str, Any], base_name: str, output_dir:
         # Fallback to basic items array
         _build_lines_from_items(prog, items)
     
-    filename = f"OrderArticleInfo_{base_name}.xml"
-    output_path = output_dir / filename
-    
-    # Prettify
-    xml_str = _prettify_xml(root)
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(xml_str)
-    
+    return root
+
+
+def build_article_info_xml(data: Dict[str, Any]) -> str:
+    """
+    Builds the OrderArticleInfo XML document as a string (no file I/O).
+    """
+    return _prettify_xml(_build_article_info_root(data))
+
+
+def generate_article_info_xml(data: Dict[str, Any], base_name: str, output_dir: Path) -> Path:
+    """
+    Generates OrderArticleInfo_TIMESTAMP.xml
+    """
+    output_path = output_dir / f"OrderArticleInfo_{base_name}.xml"
+    _write_xml(output_path, _build_article_info_root(data))
     return output_path
 
 
+def _build_line_template() -> ET.Element:
+    """Empty Line skeleton shared by both line builders; only Article_ID and Quantity vary."""
+    line = ET.Element("Line")
+    ET.SubElement(line, "GUID")
+    ET.SubElement(line, "Article_ID")
+    ET.SubElement(line, "ArticleDescription")
+    ET.SubElement(line, "Height")
+    ET.SubElement(line, "Width")
+    ET.SubElement(line, "Depth")
+    cad = ET.SubElement(line, "CadData")
+    for attr in ["px", "py", "pz", "dx", "dy", "dz", "rx", "ry", "rz"]:
+        cad.set(attr, "0.0000")
+    cad.set("IIx", "0")
+    ET.SubElement(line, "Quantity")
+    ET.SubElement(line, "Quantity_unit")
+    ET.SubElement(line, "PriceGroup")
+    ET.SubElement(line, "VzParentGuid")
+    ET.SubElement(line, "PosParentGuid")
+    ET.SubElement(line, "PosNr")
+    ET.SubElement(line, "Remarks")
+    props = ET.SubElement(line, "InternalProperties")
+    for i in range(78):
+        ET.SubElement(props, f"Propertie_{i}")
+    sublines = ET.SubElement(line, "SubLines")
+    subobj = ET.SubElement(sublines, "SubObj")
+    ET.SubElement(subobj, "SubObjGuid")
+    return line
+
+
+_LINE_TEMPLATE = _build_line_template()
+# Child positions in _LINE_TEMPLATE
+_LINE_ARTICLE_ID = 1
+_LINE_QUANTITY = 7
+
+
+def _format_quantity(qty: Any) -> str:
+    try:
+        return f"{float(qty):.2f}"
+    except (ValueError, TypeError):
+        return "1.00"
+
+
+def _build_lines(prog: ET.Element, line_values: Iterable[Tuple[str, Any]]) -> None:
+    """Append one Line per (raw article id, raw quantity) pair, cloned from _LINE_TEMPLATE."""
+    for article_id, qty in line_values:
+        line = copy.deepcopy(_LINE_TEMPLATE)
+        line[_LINE_ARTICLE_ID].text = _fix_article_id_ocr(article_id)
+        line[_LINE_QUANTITY].text = _format_quantity(qty)
+        prog.append(line)
+
+
 def _build_lines_from_articles(prog: ET.Element, articles: List[Dict[str, Any]]) -> None:
     """
     Build Line elements from detailed articles array.
     Only Article_ID and Quantity are populated; rest empty. Furncloud is only in Program Remarks.
     """
-    for article in articles:
-        line = ET.SubElement(prog, "Line")
-        
-        ET.SubElement(line, "GUID")
-        ET.SubElement(line, "Article_ID").text = _fix_article_id_ocr(str(article.get("article_id", "")))
-        ET.SubElement(line, "ArticleDescription")
-        ET.SubElement(line, "Height")
-        ET.SubElement(line, "Width")
-        ET.SubElement(line, "Depth")
-        cad = ET.SubElement(line, "CadData")
-        for attr in ["px", "py", "pz", "dx", "dy", "dz", "rx", "ry", "rz"]:
-            cad.set(attr, "0.0000")
-        cad.set("IIx", "0")
-        qty = article.get("quantity", 1)
-        try:
-            qty_str = f"{float(qty):.2f}"
-        except (ValueError, TypeError):
-            qty_str = "1.00"
-        ET.SubElement(line, "Quantity").text = qty_str
-        ET.SubElement(line, "Quantity_unit")
-        ET.SubElement(line, "PriceGroup")
-        ET.SubElement(line, "VzParentGuid")
-        ET.SubElement(line, "PosParentGuid")
-        ET.SubElement(line, "PosNr")
-        ET.SubElement(line, "Remarks")
-        props = ET.SubElement(line, "InternalProperties")
-        for i in range(78):
-            ET.SubElement(props, f"Propertie_{i}")
-        sublines = ET.SubElement(line, "SubLines")
-        subobj = ET.SubElement(sublines, "SubObj")
-        ET.SubElement(subobj, "SubObjGuid")
+    _build_lines(prog, ((str(article.get("article_id", "")), article.get("quantity", 1)) for article in articles))
 
 
-def _build_lines_from_items(prog: ET.Element, items: List[Dict[str, Any]]) -> None:
-    """
-    Fallback: Build Line elements from basic items array.
-    Only Article_ID (modellnummer-artikelnummer) and Quantity are populated; rest empty. Furncloud is only in Program Remarks.
-    """
+def _item_line_values(items: List[Dict[str, Any]]) -> Iterator[Tuple[str, str]]:
     for item in items:
-        line = ET.SubElement(prog, "Line")
         modellnummer = _get_val(item, "modellnummer")
         artikelnummer = _get_val(item, "artikelnummer")
         if modellnummer and artikelnummer:
             article_id_str = f"{modellnummer}-{artikelnummer}"
         else:
             article_id_str = modellnummer or artikelnummer
-        ET.SubElement(line, "GUID")
-        ET.SubElement(line, "Article_ID").text = _fix_article_id_ocr(article_id_str)
-        ET.SubElement(line, "ArticleDescription")
-        ET.SubElement(line, "Height")
-        ET.SubElement(line, "Width")
-        ET.SubElement(line, "Depth")
-        cad = ET.SubElement(line, "CadData")
-        for attr in ["px", "py", "pz", "dx", "dy", "dz", "rx", "ry", "rz"]:
-            cad.set(attr, "0.0000")
-        cad.set("IIx", "0")
-        qty_val = _get_val(item, "menge", "1")
-        try:
-            qty_str = f"{float(qty_val):.2f}"
-        except (ValueError, TypeError):
-            qty_str = "1.00"
-        ET.SubElement(line, "Quantity").text = qty_str
-        ET.SubElement(line, "Quantity_unit")
-        ET.SubElement(line, "PriceGroup")
-        ET.SubElement(line, "VzParentGuid")
-        ET.SubElement(line, "PosParentGuid")
-        ET.SubElement(line, "PosNr")
-        ET.SubElement(line, "Remarks")
-        props = ET.SubElement(line, "InternalProperties")
-        for i in range(78):
-            ET.SubElement(props, f"Propertie_{i}")
-        sublines = ET.SubElement(line, "SubLines")
-        subobj = ET.SubElement(sublines, "SubObj")
-        ET.SubElement(subobj, "SubObjGuid")
+        yield article_id_str, _get_val(item, "menge", "1")
+
+
+def _build_lines_from_items(prog: ET.Element, items: List[Dict[str, Any]]) -> None:
+    """
+    Fallback: Build Line elements from basic items array.
+    Only Article_ID (modellnummer-artikelnummer) and Quantity are populated; rest empty. Furncloud is only in Program Remarks.
+    """
+    _build_lines(prog, _item_line_values(items))
+
 
 def export_xmls(data: Dict[str, Any], base_name: str, config: Config, output_dir: Path) -> List[Path]:
     """Generates both XML files and returns their paths. Filename base = kom_nr else kom_name else 'unknown' (no message_id)."""